@@ -36,13 +36,36 @@ flo.Lambda, often abbreviated as `e_`, which allows for nearly everything you ca
 
 """
 
+from importlib import import_module
+from importlib.util import find_spec
+
 from .lamb import Lambda, start, as_fcn, e_
 from .check import each, that
 from .it2 import from_, unique_index, for_each
 from .attempt import try_, as_try, Attempt
-from .parallel import pmap, tmap
 
-try:
-    from .pds import FloSeries as Series, FloDataFrame as DataFrame
-except ImportError:
-    pass
+__all__ = ['Lambda', 'start', 'as_fcn', 'e_', 'each', 'that', 'from_', 'unique_index', 'for_each',
+           'try_', 'as_try', 'Attempt', 'pmap', 'tmap']
+# finding pandas doesn't import it, so `from flo import *` only pulls it in where it's installed
+if find_spec('pandas') is not None:
+    __all__ += ['Series', 'DataFrame']
+
+
+def __getattr__(name: str):
+    # parallel and pds pull in multiprocessing, joblib, and pandas,
+    # so only import them once one of their entry points is actually used
+    if name in ('pmap', 'tmap'):
+        from .parallel import pmap, tmap
+        globals().update(pmap=pmap, tmap=tmap)
+        return globals()[name]
+    if name in ('Series', 'DataFrame', 'pds'):
+        try:
+            from .pds import FloSeries, FloDataFrame
+        except ImportError as e:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r} since pandas isn't available") from e
+        globals().update(Series=FloSeries, DataFrame=FloDataFrame)
+        return globals()[name]
+    if name == 'parallel':
+        # importing the subpackage sets it as an attribute of this module
+        return import_module('.parallel', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
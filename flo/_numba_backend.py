@@ -0,0 +1,204 @@
+"""
+Optional numba-compiled fast path for numeric pipelines over 1-d numpy arrays.
+
+A pipeline qualifies if every step is a map or filter ElementStep whose function is a Lambda built only from
+arithmetic (e_ + 3, e_ % 2, ...) and comparisons (e_ < 10, ...) against numeric constants that fit the array's dtype.
+Such a pipeline is translated into a numba kernel, which runs the whole pipeline in compiled code
+instead of stepping through python generators element by element.
+Anything numba can't compile falls back to the python path.
+
+Kernels are compiled without parallel=True: numba's threading layer deadlocks forked worker processes,
+e.g., those of flo.parallel.Processes.
+"""
+import operator
+import sys
+from functools import partial, lru_cache
+from typing import *
+
+from . import pipeline as _pipeline
+from .lamb import Lambda, _operate
+from .pipeline import Pipeline, ElementStep
+
+# Below this many elements, the one-time compile cost outweighs anything the kernel saves
+MIN_SIZE = 100_000
+
+# Lambda comparisons are stored reflected, e.g., e_ < 3 is partial(operator.gt, 3)
+_COMPARISONS = {operator.eq: '==', operator.ne: '!=', operator.gt: '<', operator.ge: '<=', operator.lt: '>', operator.le: '>='}
+_ARITHMETIC = {operator.add: '+', operator.sub: '-', operator.truediv: '/', operator.mod: '%'}
+
+# compiled kernels kept around; each is specific to a pipeline's shape, not to its constants
+MAX_KERNELS = 128
+
+Kernel = Callable[['np.ndarray'], 'np.ndarray']
+
+
+@lru_cache(maxsize=None)
+def _numba():
+    # numba takes a while to import, so only do it once there's an ndarray to compile for
+    try:
+        import numba
+        return numba
+    except ImportError:
+        return None
+
+
+def _is_number(value) -> bool:
+    # numpy scalars, but not arrays, which would broadcast instead
+    return isinstance(value, (int, float)) or type(value).__module__ == 'numpy' and getattr(value, 'ndim', None) == 0
+
+
+def _fits(value, dtype: 'np.dtype') -> bool:
+    """Whether numba can take value as an operand for elements of dtype without it overflowing"""
+    import numpy as np
+    if isinstance(value, (float, np.floating)):
+        return True
+    # numba types python ints as int64, and integer elements can't mix with out-of-range constants anyway
+    limits = np.iinfo(dtype if dtype.kind in 'iu' else np.int64)
+    return limits.min <= value <= limits.max
+
+
+def _expression(accessor: Callable, var: str, constant: str) -> Optional[Tuple[str, Any]]:
+    """Returns python source applying accessor to var, with its operand referenced as constant"""
+    if not isinstance(accessor, partial) or accessor.keywords:
+        return None
+    if accessor.func in _COMPARISONS and len(accessor.args) == 1:
+        op, other = _COMPARISONS[accessor.func], accessor.args[0]
+    elif accessor.func is _operate and len(accessor.args) == 2 and accessor.args[0] in _ARITHMETIC:
+        op, other = _ARITHMETIC[accessor.args[0]], accessor.args[1]
+    else:
+        return None
+    if not _is_number(other):
+        return None
+    return f"({var} {op} {constant})", other
+
+
+def _lambda_of(fcn: Callable) -> Optional[Lambda]:
+    lamb = getattr(fcn, '__self__', None)
+    if isinstance(lamb, Lambda) and getattr(fcn, '__func__', None) is Lambda.invoke:
+        return lamb
+    return None
+
+
+def numeric_stages(pipeline: Pipeline) -> Optional[List[Tuple[str, str, Any]]]:
+    """If pipeline is purely numeric, returns for each stage its kind, the expression it evaluates on v,
+    and the constant that expression references. Otherwise returns None."""
+    if not pipeline.steps:
+        return None
+    stages = []
+    for n, step in enumerate(pipeline.steps):
+        if not isinstance(step, ElementStep) or step.kind not in ('map', 'filter'):
+            return None
+        lamb = _lambda_of(step.fcn)
+        # Lambda arithmetic and comparisons return plain functions, so they're always a single accessor off e_
+        if lamb is None or len(lamb._chain) != 1:
+            return None
+        translated = _expression(lamb._chain[0], 'v', f"c{n}")
+        if translated is None:
+            return None
+        stages.append((step.kind, *translated))
+    return stages
+
+
+def is_pure_numeric(pipeline: Pipeline) -> bool:
+    return numeric_stages(pipeline) is not None
+
+
+def _output_dtype(pipeline: Pipeline, dtype: 'np.dtype') -> 'np.dtype':
+    import numpy as np
+    # run the map stages on a sample element to see what type they produce
+    v = dtype.type(1)
+    with np.errstate(all='ignore'):
+        for step in pipeline.steps:
+            if step.kind == 'map':
+                v = step.fcn(v)
+    return np.asarray(v).dtype
+
+
+def _generate(stages: List[Tuple[str, str, Any]]) -> str:
+    """Generates the kernel source, e.g., for from_(a).map(e_ + 3).filter(e_ < 10):
+    def _kernel(c0, c1, a):
+        n = a.shape[0]
+        out = np.empty(n, dtype=out_dtype)
+        keep = np.zeros(n, dtype=np.bool_)
+        for i in range(n):
+            v = a[i]
+            v = (v + c0)
+            if (v < c1):
+                out[i] = v
+                keep[i] = True
+        return out[keep]
+    The constants are arguments rather than globals, so pipelines differing only in them share a kernel.
+    """
+    has_filter = any(kind == 'filter' for kind, _, _ in stages)
+    lines = [f"def _kernel({''.join(f'c{n}, ' for n in range(len(stages)))}a):",
+             "    n = a.shape[0]",
+             "    out = np.empty(n, dtype=out_dtype)"]
+    if has_filter:
+        lines.append("    keep = np.zeros(n, dtype=np.bool_)")
+    lines += ["    for i in range(n):",
+              "        v = a[i]"]
+    indent = "        "
+    for kind, expression, _ in stages:
+        if kind == 'map':
+            lines.append(f"{indent}v = {expression}")
+        else:
+            lines.append(f"{indent}if {expression}:")
+            indent += "    "
+    lines.append(f"{indent}out[i] = v")
+    if has_filter:
+        lines += [f"{indent}keep[i] = True",
+                  "    return out[keep]"]
+    else:
+        lines.append("    return out")
+    return '\n'.join(lines)
+
+
+@lru_cache(maxsize=MAX_KERNELS)
+def _compile(source: str, out_dtype: str, signature: tuple) -> Optional[Callable]:
+    """Compiles the kernel source for exactly signature, or returns None if numba can't"""
+    import numpy as np
+    numba = _numba()
+    namespace = {'np': np, 'out_dtype': np.dtype(out_dtype)}
+    exec(compile(source, '<flo-numba>', 'exec'), namespace)
+    # numpy's error model matches what the element-wise path does with numpy scalars, e.g., 1/0 -> inf.
+    # Kernels are generated by exec rather than defined in a file, so numba can't cache them on disk
+    kernel = numba.njit(error_model='numpy')(namespace['_kernel'])
+    try:
+        kernel.compile(signature)
+    except numba.core.errors.NumbaError:
+        return None
+    # Any other signature would compile lazily on first call, outside the try above
+    kernel.disable_compile()
+    return kernel
+
+
+def kernel_for(pipeline: Pipeline, src) -> Optional[Kernel]:
+    """Returns a compiled kernel equivalent to applying pipeline to src and collecting the result into an array,
+    or None if numba isn't available or the pipeline or src don't qualify."""
+    np = sys.modules.get('numpy')
+    if np is None or not isinstance(src, np.ndarray) or src.ndim != 1:
+        return None
+    # with FLO_TRACE on, keep apply's reporting of which item failed
+    if len(src) < MIN_SIZE or _pipeline.TRACE:
+        return None
+    return kernel_for_dtype(pipeline, src.dtype)
+
+
+def kernel_for_dtype(pipeline: Pipeline, dtype) -> Optional[Kernel]:
+    """Returns a compiled kernel applying pipeline to 1-d arrays of dtype,
+    or None if numba isn't available or the pipeline or dtype don't qualify."""
+    import numpy as np
+    dtype = np.dtype(dtype)
+    if dtype.kind not in 'biuf':
+        return None
+    stages = numeric_stages(pipeline)
+    if stages is None or not all(_fits(c, dtype) for _, _, c in stages):
+        return None
+    numba = _numba()
+    if numba is None:
+        return None
+    constants = [c for _, _, c in stages]
+    # 'A' layout accepts strided views as well as contiguous arrays
+    signature = (*map(numba.typeof, constants), numba.types.Array(numba.from_dtype(dtype), 1, 'A'))
+    kernel = _compile(_generate(stages), _output_dtype(pipeline, dtype).str, signature)
+    return None if kernel is None else partial(kernel, *constants)
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+import abc
 from functools import partial
 from logging import Logger
 
@@ -8,40 +8,102 @@ from typing import *
 R1 = TypeVar('R1')
 
 
-@dataclass(init=False)
-class Attempt(Generic[R]):
+class Attempt(abc.ABC, Generic[R]):
+    """Outcome of trying to call a function: either a Success holding a result or a Failure holding an exception.
+    Attempt(result=...) and Attempt(exception=...) construct the appropriate subclass."""
+    __slots__ = ('_result', '_exception')
     _result: R
     _exception: Exception
 
+    def __new__(cls, *, result: R = UNASSIGNED, exception: Exception = UNASSIGNED):
+        if cls is Attempt:
+            cls = Success if exception is UNASSIGNED else Failure
+        return super().__new__(cls)
+
     def __init__(self, *, result: R = UNASSIGNED, exception: Exception = UNASSIGNED):
         self._result = result
         self._exception = exception
 
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return (self._result, self._exception) == (other._result, other._exception)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(_result={self._result!r}, _exception={self._exception!r})"
+
+    @abc.abstractmethod
+    def result(self) -> R:
+        pass
+
+    @abc.abstractmethod
+    def exception(self) -> Optional[Exception]:
+        pass
+
+    @abc.abstractmethod
+    def succeeded(self) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def failed(self) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def and_then(self, fcn: FunctionOrLambda, **kwargs) -> 'Attempt[R1]':
+        pass
+
+    @abc.abstractmethod
+    def or_else(self, default: R = None, log: Logger = None) -> R:
+        pass
+
+
+class Success(Attempt[R]):
+    __slots__ = ()
+
+    def __init__(self, *, result: R = UNASSIGNED, exception: Exception = UNASSIGNED):
+        Attempt.__init__(self, result=result, exception=None)
+
     def result(self) -> R:
-        if self._result is UNASSIGNED:
-            raise self._exception
         return self._result
 
     def exception(self) -> Optional[Exception]:
-        if self._exception is UNASSIGNED:
-            return None
+        return None
+
+    def succeeded(self) -> bool:
+        return True
+
+    def failed(self) -> bool:
+        return False
+
+    def and_then(self, fcn: FunctionOrLambda, **kwargs) -> 'Attempt[R1]':
+        return try_(fcn, self._result, **kwargs)
+
+    def or_else(self, default: R = None, log: Logger = None) -> R:
+        return self._result
+
+
+class Failure(Attempt[R]):
+    __slots__ = ()
+
+    def __init__(self, *, result: R = UNASSIGNED, exception: Exception = UNASSIGNED):
+        Attempt.__init__(self, result=None, exception=exception)
+
+    def result(self) -> R:
+        raise self._exception
+
+    def exception(self) -> Optional[Exception]:
         return self._exception
 
     def succeeded(self) -> bool:
-        return self._result is not UNASSIGNED
+        return False
 
     def failed(self) -> bool:
-        return self._exception is not UNASSIGNED
+        return True
 
     def and_then(self, fcn: FunctionOrLambda, **kwargs) -> 'Attempt[R1]':
-        if self.succeeded():
-            return try_(fcn, self.result(), **kwargs)
-        else:
-            return self
+        return self
 
     def or_else(self, default: R = None, log: Logger = None) -> R:
-        if self.succeeded():
-            return self.result()
         if log is not None:
             log.exception(str(self._exception), exc_info=self._exception)
         return default
@@ -50,9 +112,9 @@ class Attempt(Generic[R]):
 def try_(fcn: FunctionOrLambda, *args, **kwargs) -> Attempt[R]:
     f = as_fcn(fcn)
     try:
-        return Attempt(result=f(*args, **kwargs))
+        return Success(result=f(*args, **kwargs))
     except Exception as e:
-        return Attempt(exception=e)
+        return Failure(exception=e)
 
 
 def as_try(fcn: FunctionOrLambda, *args, **kwargs) -> Function:
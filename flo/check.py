@@ -1,6 +1,6 @@
 from typing import Union, Callable, Any, TypeVar, Tuple
 
-from flo.lamb import Lambda, start, as_name_function
+from flo.lamb import Lambda, start, as_name_function, returns_bool
 
 i_ = start
 
@@ -65,9 +65,10 @@ def each(test: Expression, *args: T, msg: str = None, **kwargs: T) -> Tuple[T, .
     instances = (*((f"Value #{n + 1}", a) for n, a in enumerate(args)), *kwargs.items())
     failed = False
 
+    known_bool = returns_bool(test)
     for label, instance in instances:
         ret = fcn(instance)
-        if not isinstance(ret, bool):
+        if not known_bool and not isinstance(ret, bool):
             raise ValueError(f'Test {fname} for {label}={instance} does not evaluate to a bool.')
         if not ret:
             if msg and not msg[-1].isspace():
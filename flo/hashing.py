@@ -1,10 +1,16 @@
 import base64
+import hashlib
 from _hashlib import HASH
 from dataclasses import dataclass
 from hashlib import md5
-from io import DEFAULT_BUFFER_SIZE
+from io import DEFAULT_BUFFER_SIZE, BytesIO
 from typing import IO, Callable
 
+# Larger reads amortize the per-chunk python overhead when hashlib.file_digest isn't available
+BUFSIZE = DEFAULT_BUFFER_SIZE * 16
+
+_file_digest = getattr(hashlib, 'file_digest', None)  # python 3.11+
+
 
 @dataclass()
 class Hash(object):
@@ -17,11 +23,19 @@ class Hash(object):
         return self._h.hexdigest()
 
     def base64(self) -> str:
+        return base64.b64encode(self.digest()).decode('ascii')
+
+    def b32(self) -> bytes:
+        """base32-encoded digest, which is what base64() used to return"""
         return base64.b32encode(self.digest())
 
 
 def file_hash(io: IO[bytes], hash_fcn: Callable[[], HASH] = md5) -> Hash:
+    # file_digest hashes a BytesIO's entire buffer rather than from the current position,
+    # so only hand it real files
+    if _file_digest is not None and hasattr(io, 'readinto') and not isinstance(io, BytesIO):
+        return Hash(_file_digest(io, hash_fcn))
     h = hash_fcn()
-    while chunk := io.read(DEFAULT_BUFFER_SIZE):
+    while chunk := io.read(BUFSIZE):
         h.update(chunk)
     return Hash(h)
@@ -1,7 +1,7 @@
 from typing import *
 
-from .lamb import as_name_function, kwarg_str
-from .pipeline import Pipeline, Mapper, Filter, Collector, pipeline
+from ._numba_backend import kernel_for
+from .pipeline import Pipeline, Mapper, Filter, Collector, pipeline, index, unique_index
 
 _E = TypeVar('_E')  # Iterator element type
 _E1 = TypeVar('_E1')
@@ -22,6 +22,7 @@ def for_each(*elements: _E) -> 'It[_E]':
 
 
 class It(Generic[_R]):
+    __slots__ = ('_src', '_pipeline')
     _src: Iterable[_E]
     _pipeline: Pipeline[_E, _R]
 
@@ -81,12 +82,14 @@ class It(Generic[_R]):
     def takewhile(self, condition: Filter, **kwargs) -> 'It[_E]':
         return self._with(self._pipeline.takewhile(condition, **kwargs))
 
-    def cache(self) -> 'It[_E]':
+    def cache(self, dtype=None) -> 'It[_E]':
         """
         Caches the results of the iterator at this point, in memory,
         such that the iterator can be rerun without recomputing steps.
+        :param dtype If given, the results are cached in a numpy array of this dtype, which is far more compact
+            than a tuple of python numbers. The first run then computes all the results before yielding any.
         """
-        return It(CachingIt(self), pipeline(str(self)))
+        return It(CachingIt(self, dtype), pipeline(str(self)))
 
     def collect(self, collector: Collector, *collectors: Collector, **kwargs) -> '_C':
         """Drain the elements from the iterable into the collector function(s).
@@ -98,6 +101,11 @@ class It(Generic[_R]):
             kwargs are only passed to the first reducer
         """
         pipeline = self._pipeline.collect(collector, *collectors, **kwargs)
+        kernel = kernel_for(self._pipeline, self._src)
+        if kernel is not None:
+            # numeric pipeline over a large ndarray: compute it in compiled code and collect from the array,
+            # iterating over it as collectors would over any other pipeline, e.g., so next still works
+            return pipeline.transform(iter(kernel(self._src)))
         return pipeline(self._src)
 
     where = filter
@@ -119,58 +127,38 @@ class It(Generic[_R]):
         return self._pipeline.label
 
 
-def index(it: Iterator[_E], key: Mapper, **kwargs) -> Mapping[_R, Sequence[_E]]:
-    label, f = as_name_function(key)
-    kwargstr = kwarg_str(kwargs)
-    d = {}
-    e = None
-    try:
-        for e in it:
-            k = f(e, **kwargs)
-            v = d.get(k)
-            if v is None:
-                v = []
-                d[k] = v
-            v.append(e)
-    except Exception as ee:
-        raise type(ee)(f"Failed to index {it} with {label}({e}{kwargstr})", ee)
-
-    return d
-
-
-def unique_index(it: Iterator[_E], key: Mapper, **kwargs) -> Mapping[_R, _E]:
-    label, f = as_name_function(key)
-    kwargstr = kwarg_str(kwargs)
-    d = {}
-    e = None
-    try:
-        for e in it:
-            k = f(e, **kwargs)
-            if k in d:
-                raise KeyError(f"Non-unique keys for {label}({e}{kwargstr}) = {k}")
-            d[k] = e
-    except Exception as ee:
-        raise type(ee)(f"Failed to index {it} with {label}({e}{kwargstr})", ee)
-
-    return d
-
-
 class CachingIt(Iterable[_E]):
+    __slots__ = ('_src', '_cache', '_done', '_dtype')
     _src: Iterable[_E]
-    _cache: List[_E]
+    _cache: Sequence[_E]
+    _done: bool
+    _dtype: Any
 
-    def __init__(self, src: It[_E]):
+    def __init__(self, src: It[_E], dtype=None):
         self._src = src
-        self._cache = []
+        self._cache = ()
+        self._done = False
+        self._dtype = dtype
 
     def __iter__(self) -> Iterator[_E]:
-        if self._cache:
-            for e in self._cache:
-                yield e
+        if self._done:
+            yield from self._cache
             return
+        if self._dtype is not None:
+            self._cache = self._src._pipeline.materialize(self._src._src, self._dtype)
+            self._done = True
+            yield from self._cache
+            return
+        # only a run that reaches the end of src may populate the cache,
+        # so an abandoned or failed partial run is never replayed as if complete
+        cache = []
         try:
             for e in self._src:
-                self._cache.append(e)
+                cache.append(e)
                 yield e
         except:
-            self._cache.clear()
+            # discard the partial results without touching a cache another run may have completed
+            cache.clear()
+            return
+        self._cache = tuple(cache)
+        self._done = True
@@ -12,10 +12,12 @@ instead of
 
 """
 import inspect
+import operator
 import re
-from functools import partial
+import sys
+from functools import partial, lru_cache
 from operator import attrgetter, itemgetter
-from typing import TypeVar, Callable, Union, Any, Mapping, Container, Tuple
+from typing import TypeVar, Callable, Union, Any, Mapping, Container, Tuple, Optional
 
 I = TypeVar('I')
 R = TypeVar('R')
@@ -27,14 +29,29 @@ FunctionOrLambda = Union[Function, 'Lambda']
 
 
 class Lambda(object):
+    __slots__ = ('_parent', '_accessor', 'name_', '_returns_bool', '_chain', '_repr')
     _parent: 'Lambda'
     _accessor: Function
     name_: str
+    _returns_bool: bool
+    _chain: Tuple[Function, ...]
+    f: Function
+    _repr: Optional[str]
 
-    def __init__(self, parent: 'Lambda', accessor: Function, name_: str):
+    def __init__(self, parent: 'Lambda', accessor: Function, name_: str, returns_bool: bool = False):
         self._parent = parent
         self._accessor = accessor
         self.name_ = name_
+        self._returns_bool = returns_bool
+        self._init_chain()
+
+    def _init_chain(self) -> None:
+        # flatten the parent links once so invoke is a simple loop rather than a recursive walk
+        chain = self._parent._chain if self._parent is not None else ()
+        if self._accessor is not None:
+            chain += (self._accessor,)
+        self._chain = chain
+        self._repr = None  # Lambdas are immutable, so their repr is only built once, on demand
 
     def __getattr__(self, item: str) -> 'Lambda':
         return Lambda(self, attrgetter(item), f'.{item}')
@@ -48,56 +65,59 @@ class Lambda(object):
         name = f'({argstr}{", " if argstr and kwargstr else ""}{kwargstr})'
         return Lambda(self, partial(_call, args=args, kwargs=kwargs), name)
 
+    # comparisons are reflected so the C-level operator can take other as its bound first argument,
+    # e.g., e < other is computed as other > e
     def __eq__(self, other) -> Function:
-        return Lambda(self, lambda e: e == other, '==' + str(other)).f
+        return Lambda(self, partial(operator.eq, other), '==' + str(other), returns_bool=True).f
 
     def __ne__(self, other) -> Function:
-        return Lambda(self, lambda e: e != other, '!=' + str(other)).f
+        return Lambda(self, partial(operator.ne, other), '!=' + str(other), returns_bool=True).f
 
     def __lt__(self, other) -> Function:
-        return Lambda(self, lambda e: e < other, '<' + str(other)).f
+        return Lambda(self, partial(operator.gt, other), '<' + str(other), returns_bool=True).f
 
     def __le__(self, other) -> Function:
-        return Lambda(self, lambda e: e <= other, '<=' + str(other)).f
+        return Lambda(self, partial(operator.ge, other), '<=' + str(other), returns_bool=True).f
 
     def __gt__(self, other) -> Function:
-        return Lambda(self, lambda e: e > other, '>' + str(other)).f
+        return Lambda(self, partial(operator.lt, other), '>' + str(other), returns_bool=True).f
 
     def __ge__(self, other) -> Function:
-        return Lambda(self, lambda e: e >= other, '>=' + str(other)).f
+        return Lambda(self, partial(operator.le, other), '>=' + str(other), returns_bool=True).f
 
     def __add__(self, other) -> Function:
-        return Lambda(self, lambda e: e + other, '+' + str(other)).f
+        return Lambda(self, partial(_operate, operator.add, other), '+' + str(other)).f
 
     def __sub__(self, other) -> Function:
-        return Lambda(self, lambda e: e - other, '-' + str(other)).f
+        return Lambda(self, partial(_operate, operator.sub, other), '-' + str(other)).f
 
     def __truediv__(self, other) -> Function:
-        return Lambda(self, lambda e: e / other, '/' + str(other)).f
+        return Lambda(self, partial(_operate, operator.truediv, other), '/' + str(other)).f
 
     def __mod__(self, other) -> Function:
-        return Lambda(self, lambda e: e % other, '%' + str(other)).f
+        return Lambda(self, partial(_operate, operator.mod, other), '%' + str(other)).f
 
     def __invert__(self) -> 'Lambda':
         return self.negate()
 
     def negate(self) -> 'Lambda':
-        return Lambda(self, lambda e: not e, ' not')
+        return Lambda(self, lambda e: not e, ' not', returns_bool=True)
 
     def apply(self, fcn: Function, **kwargs) -> 'Lambda':
-        return Lambda(self, partial(fcn, **kwargs), f".apply({fcn.__name__}{kwarg_str(kwargs)})")
+        return Lambda(self, partial(fcn, **kwargs), f".apply({fcn.__name__}{kwarg_str(kwargs)})",
+                      returns_bool=fcn is bool)
 
     def apply_(self, fcn: Function) -> Function:
         return self.apply(fcn).f
 
     def has(self, item) -> 'Lambda':
-        return Lambda(self, lambda e: (e is not None) and (item in e), f' contains {repr(item)}')
+        return Lambda(self, lambda e: (e is not None) and (item in e), f' contains {repr(item)}', returns_bool=True)
 
     def is_none(self) -> 'Lambda':
-        return Lambda(self, lambda e: e is None, f' is None')
+        return Lambda(self, lambda e: e is None, f' is None', returns_bool=True)
 
     def not_none(self) -> 'Lambda':
-        return Lambda(self, lambda e: e is not None, f' is not None')
+        return Lambda(self, lambda e: e is not None, f' is not None', returns_bool=True)
 
     def between(self, left: Union[I, str, tuple, list], right: I = UNASSIGNED, *,
                 left_inclusive: bool = True, right_inclusive: bool = False) -> 'Lambda':
@@ -122,16 +142,9 @@ class Lambda(object):
         """
         left, right, left_inclusive, right_inclusive = interpret_between(left, right, left_inclusive, right_inclusive)
 
-        if left_inclusive:
-            if right_inclusive:
-                return Lambda(self, lambda e: left <= e <= right, f' in [{left},{right}]')
-            else:
-                return Lambda(self, lambda e: left <= e < right, f' in [{left},{right})')
-        else:
-            if right_inclusive:
-                return Lambda(self, lambda e: left < e <= right, f' in ({left},{right}]')
-            else:
-                return Lambda(self, lambda e: left < e < right, f' in ({left},{right})')
+        accessor = _BETWEEN_OPS[left_inclusive, right_inclusive](left, right)
+        label = f" in {'[' if left_inclusive else '('}{left},{right}{']' if right_inclusive else ')'}"
+        return Lambda(self, accessor, label, returns_bool=True)
 
     def truthy(self) -> 'Lambda':
         return self.apply(bool)
@@ -142,31 +155,48 @@ class Lambda(object):
     def matches(self, regex, case: bool = False) -> 'Lambda':
         if isinstance(regex, str):
             regex = re.compile(regex, re.IGNORECASE if not case else 0)
+        match = regex.match
 
         def fcn(e: str) -> bool:
-            return regex.match(e) is not None
+            return match(e) is not None
 
-        return Lambda(self, fcn, str(regex))
+        return Lambda(self, fcn, str(regex), returns_bool=True)
 
     def sub_(self, regex, rpl: str) -> 'Lambda':
-        return Lambda(self, lambda s: re.sub(regex, rpl, s), f'{{{regex}->{rpl}}}')
+        sub = (re.compile(regex) if isinstance(regex, str) else regex).sub
+        return Lambda(self, lambda s: sub(rpl, s), f'{{{regex}->{rpl}}}')
 
     def is_in(self, container: Container) -> 'Lambda':
-        return Lambda(self, lambda e: e in container, ' in ' + str(container))
+        lookup = _hashed(container)
+        if lookup is not container:
+            contains = partial(_hashed_contains, lookup, container)
+        elif type(container) in _BOOL_CONTAINERS:
+            contains = container.__contains__
+        else:
+            # `in` makes a bool of whatever __contains__ returns, e.g., a numpy bool from an ndarray
+            contains = partial(operator.contains, container)
+        return Lambda(self, contains, ' in ' + str(container), returns_bool=True)
 
     def not_in(self, container: Container) -> 'Lambda':
-        return Lambda(self, lambda e: e not in container, ' not in ' + str(container))
+        lookup = _hashed(container)
+        if lookup is not container:
+            return Lambda(self, lambda e: not _hashed_contains(lookup, container, e), ' not in ' + str(container),
+                          returns_bool=True)
+        return Lambda(self, lambda e: e not in container, ' not in ' + str(container), returns_bool=True)
 
     def instanceof(self, *types: type) -> 'Lambda':
-        return Lambda(self, lambda e: isinstance(e, types), f'.instanceof({", ".join(t.__name__ for t in types)})')
+        # isinstance is quicker given a single class than a tuple; defaults make isinstance and the class fast locals
+        if len(types) == 1:
+            accessor = lambda e, _isinstance=isinstance, _type=types[0]: _isinstance(e, _type)
+        else:
+            accessor = lambda e, _isinstance=isinstance, _types=types: _isinstance(e, _types)
+        return Lambda(self, accessor, f'.instanceof({", ".join(t.__name__ for t in types)})', returns_bool=True)
 
     def invoke(self, instance: I, **kwargs) -> R:
-        if self._parent is not None and self._parent._accessor is not None:
-            p = self._parent.invoke(instance, **kwargs)
-            return self._accessor(p)
-        if self._accessor:
-            return self._accessor(instance)
-        return instance
+        v = instance
+        for accessor in self._chain:
+            v = accessor(v)
+        return v
 
     def as_try(self) -> Function:
         """Returns this Lambda as a function that will attempt execution
@@ -176,34 +206,49 @@ class Lambda(object):
 
     @property
     def f(self):
+        # a fresh bound method each time, as keeping one on self would make every Lambda a reference cycle
         return self.invoke
 
     def __repr__(self) -> str:
-        if self._parent is None:
-            return self.name_ or 'unknown'
-        r = repr(self._parent) + self.name_
+        r = self._repr
+        if r is None:
+            r = (self.name_ or 'unknown') if self._parent is None else repr(self._parent) + self.name_
+            self._repr = r
         return r
 
     def __str__(self) -> str:
         return repr(self)
 
     def __getstate__(self) -> Mapping[str, Any]:
-        return self.__dict__
+        return dict(_parent=self._parent, _accessor=self._accessor, name_=self.name_, _returns_bool=self._returns_bool)
 
     def __setstate__(self, state: Mapping[str, Any]) -> None:
         self._parent = state['_parent']
         self._accessor = state['_accessor']
         self.name_ = state['name_']
+        self._returns_bool = state.get('_returns_bool', False)
+        self._init_chain()
 
 
 start = Lambda(name_='_', parent=None, accessor=None)
 
 
+_BETWEEN_RE = re.compile(r"\s*([\[(])\s*([0-9._]+)\s*,\s*([0-9._]+)\s*([\])])\s*")
+
+# accessor factories for between, keyed by (left_inclusive, right_inclusive)
+_BETWEEN_OPS = {
+    (True, True): lambda left, right: lambda e: left <= e <= right,
+    (True, False): lambda left, right: lambda e: left <= e < right,
+    (False, True): lambda left, right: lambda e: left < e <= right,
+    (False, False): lambda left, right: lambda e: left < e < right,
+}
+
+
 def interpret_between(left: I, right: I, left_inclusive: bool, right_inclusive: bool) -> Tuple[I, I, bool, bool]:
     if right is UNASSIGNED:
         # interpret left
         if isinstance(left, str):
-            m = re.fullmatch(r"\s*([[(])\s*([0-9._]+)\s*,\s*([0-9._]+)\s*([])])\s*", left)
+            m = _BETWEEN_RE.fullmatch(left)
             if not m:
                 raise ValueError(f"Unrecognized between spec '{left}'")
             left_brace, left_str, right_str, right_brace = m.groups()
@@ -225,32 +270,71 @@ def interpret_between(left: I, right: I, left_inclusive: bool, right_inclusive:
 
 
 def as_fcn(function_or_lambda: FunctionOrLambda) -> Function:
-    if isinstance(function_or_lambda, Lambda):
+    # an exact type check is cheaper than isinstance, and as_fcn gets called a lot
+    if type(function_or_lambda) is Lambda:
         return function_or_lambda.f
     if callable(function_or_lambda):
         return function_or_lambda
     return constant(function_or_lambda).f
 
 
+def returns_bool(f: FunctionOrLambda) -> bool:
+    """Whether f is known to always return a bool, i.e., it's a Lambda (or its function) ending in a test like e_ > 3"""
+    lamb = f if isinstance(f, Lambda) else getattr(f, '__self__', None)
+    return isinstance(lamb, Lambda) and lamb._returns_bool
+
+
 def as_name_function(f: FunctionOrLambda) -> Tuple[str, Callable]:
     if isinstance(f, Lambda):
         return str(f), f.f
     return name_for(f), f
 
 
+@lru_cache(maxsize=256)
+def _lambda_source(code) -> str:
+    # getsource re-reads and tokenizes the defining file, so only do it once per lambda definition
+    try:
+        return inspect.getsource(code)[:-1]
+    except (OSError, TypeError):
+        return '<lambda>'  # e.g., defined interactively
+
+
 def name_for(function_or_lambda: FunctionOrLambda) -> str:
     if isinstance(function_or_lambda, Lambda):
         return str(function_or_lambda)
     if callable(function_or_lambda):
         name = getattr(function_or_lambda, '__name__')
         if name == '<lambda>':
-            name = inspect.getsource(function_or_lambda)[:-1]
+            name = _lambda_source(function_or_lambda.__code__)
         elif name == 'invoke':
             name = str(getattr(function_or_lambda, '__self__'))
         return name
     return str(function_or_lambda)
 
 
+# Below this size, scanning a list or tuple is about as fast as hashing into a set
+_MIN_HASHED_SIZE = 8
+# whose __contains__ is known to return a bool, so is_in can call it directly
+_BOOL_CONTAINERS = frozenset((set, frozenset, dict, list, tuple, str, bytes, range))
+
+
+def _hashed(container: Container) -> Container:
+    """Snapshots larger lists and tuples of hashable items into a frozenset for O(1) membership tests"""
+    if isinstance(container, (list, tuple)) and len(container) >= _MIN_HASHED_SIZE:
+        try:
+            return frozenset(container)
+        except TypeError:
+            pass  # unhashable elements, so stick with linear search
+    return container
+
+
+def _hashed_contains(lookup: frozenset, container: Container, e) -> bool:
+    try:
+        return e in lookup
+    except TypeError:
+        return e in container  # e itself is unhashable, e.g., a list, so it can only be found by scanning
+
+
 def constant(value) -> Lambda:
     return Lambda(parent=None, accessor=lambda e: value, name_=str(value))
 
@@ -274,6 +358,68 @@ def _call(f, args, kwargs):
     return f(*args, **kwargs)
 
 
+def _operate(op: Callable[[Any, Any], R], other, e) -> R:
+    return op(e, other)
+
+
+_ELEMENTWISE_COMPARISONS = {operator.eq, operator.ne, operator.gt, operator.ge, operator.lt, operator.le}
+_ELEMENTWISE_ARITHMETIC = {operator.add, operator.sub, operator.truediv, operator.mod}
+
+
+def _is_scalar(value) -> bool:
+    # numpy scalars, but not arrays or lists, which numpy and pandas would compare against the whole array instead
+    return isinstance(value, (int, float, str)) or type(value).__module__ == 'numpy' and getattr(value, 'ndim', None) == 0
+
+
+def _is_elementwise(accessor: Callable) -> bool:
+    if not isinstance(accessor, partial) or accessor.keywords:
+        return False
+    if accessor.func in _ELEMENTWISE_COMPARISONS:
+        return len(accessor.args) == 1 and _is_scalar(accessor.args[0])
+    return accessor.func is _operate and len(accessor.args) == 2 and accessor.args[0] in _ELEMENTWISE_ARITHMETIC \
+        and _is_scalar(accessor.args[1])
+
+
+class _Vectorized(object):
+    """A function marked vectorized. Wrapping it, rather than setting an attribute on it,
+    works for any callable, including bound methods, builtins, numpy ufuncs and Lambdas."""
+    __slots__ = ('fcn',)
+
+    def __init__(self, fcn: Function):
+        self.fcn = fcn
+
+    def __call__(self, *args, **kwargs):
+        return self.fcn(*args, **kwargs)
+
+    @property
+    def __name__(self) -> str:
+        return f"vectorized({name_for(self.fcn)})"
+
+    def __repr__(self) -> str:
+        return self.__name__
+
+
+def vectorized(f: FunctionOrLambda) -> Function:
+    """Marks f as taking a whole numpy array or pandas Series at once and returning its result for each element,
+    e.g., ds.only_if(vectorized(lambda s: s % 2 == 0)), so it isn't applied to each element in turn"""
+    return _Vectorized(as_fcn(f))
+
+
+def vectorizes(f: FunctionOrLambda) -> bool:
+    """Whether applying f to a whole numpy array or pandas Series is known to give the same result
+    as applying it to each element, i.e., it's a numpy ufunc, marked vectorized,
+    or a Lambda built only from arithmetic and comparisons against single numbers or strings."""
+    if type(f) is _Vectorized:
+        return True
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(f, np.ufunc):
+        return True
+    lamb = f if type(f) is Lambda else getattr(f, '__self__', None)
+    if type(lamb) is not Lambda or (f is not lamb and getattr(f, '__func__', None) is not Lambda.invoke):
+        return False
+    return all(map(_is_elementwise, lamb._chain))
+
+
 e_ = start
 
 
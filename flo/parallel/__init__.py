@@ -1,7 +1,8 @@
-from typing import Iterable, Dict, Sequence, Optional
+import os
+from typing import Iterable, Dict, Sequence, Optional, Sized
 
-from ._fascade import PFascade, R, I, Done, Future, Mapper
-from ..lamb import FunctionOrLambda
+from ._fascade import PFascade, R, I, Done, FloFuture, Future, Mapper
+from ..lamb import FunctionOrLambda, as_fcn
 from ._threads import Threads
 from ._mp import Processes
 
@@ -12,6 +13,9 @@ except ImportError:
 
 singletons: Dict[str, PFascade] = {}
 
+# pmap runs inputs with fewer elements than this in the calling process, as they're not worth the pool dispatch
+SERIAL_THRESHOLD = 64
+
 
 def register_pool(key: str, pool: PFascade):
     singletons[key] = pool
@@ -21,21 +25,31 @@ def get_pool(key: str) -> Optional[PFascade]:
     return singletons.get(key)
 
 
-def pmap(func: FunctionOrLambda, it: Iterable[I], timeout: float = None, chunksize: int = 1, **kwargs) -> Sequence[R]:
+def pmap(func: FunctionOrLambda, it: Iterable[I], timeout: float = None, chunksize: int = None, **kwargs) -> Sequence[R]:
     """
     Apply func to each element of it using a shared parallel-processing backend.
-    Backend will be JobLibParallel if available, else multiprocessing-backed Processes
+    Backend will be JobLibParallel if available, else multiprocessing-backed Processes.
+    Sized inputs with fewer than SERIAL_THRESHOLD elements are mapped serially in the calling process.
+    If chunksize isn't specified, it's chosen based on the length of it and the number of cpus.
     """
+    if isinstance(it, Sized) and len(it) < SERIAL_THRESHOLD:
+        fcn = as_fcn(func)
+        return [fcn(e, **kwargs) for e in it]
+
     if 'pmap' not in singletons:
         try:
             register_pool('pmap', JobLibParallel(max_workers=-1))
         except Exception:
             register_pool('pmap', Processes(max_workers=None))
 
-    return singletons['pmap'].map_ordered(func, it, timeout=timeout, chunksize=chunksize, **kwargs)
+    pool = singletons['pmap']
+    if chunksize is None and isinstance(pool, Processes):
+        # joblib sizes its own batches, but a process pool needs chunks to amortize the per-task pickling
+        chunksize = max(1, len(it) // (4 * (os.cpu_count() or 1))) if isinstance(it, Sized) else 1
+    return pool.map_ordered(func, it, timeout=timeout, chunksize=chunksize, **kwargs)
 
 
-def tmap(func: FunctionOrLambda, it: Iterable[I], timeout: float = None, chunksize: int = 1, **kwargs) -> Sequence[R]:
+def tmap(func: FunctionOrLambda, it: Iterable[I], timeout: float = None, chunksize: int = None, **kwargs) -> Sequence[R]:
     """
     Apply func to each element of it using a shared threaded backend.
     """
@@ -43,4 +57,4 @@ def tmap(func: FunctionOrLambda, it: Iterable[I], timeout: float = None, chunksi
     if 'tmap' not in singletons:
         register_pool('tmap', Threads(max_workers=None))
 
-    return singletons['tmap'].map_ordered(func, it, timeout=timeout, chunksize=chunksize, **kwargs)
+    return singletons['tmap'].map_ordered(func, it, timeout=timeout, chunksize=chunksize or 1, **kwargs)
@@ -1,14 +1,16 @@
 import abc
-import time
+import concurrent.futures
+import threading
 from abc import abstractmethod
-from collections import deque
 from functools import partial
+from itertools import chain
+from queue import SimpleQueue, Empty
 from typing import *
 
 from tqdm import tqdm
 
 from flo.it2 import Mapper
-from flo.lamb import as_fcn, UNASSIGNED
+from flo.lamb import as_fcn
 
 I = TypeVar('I')
 R = TypeVar('R')
@@ -17,7 +19,9 @@ R = TypeVar('R')
 class PFascade(ContextManager, abc.ABC):
 
     def __init__(self, max_workers: int = None):
-        pass
+        # started on demand, to submit tasks whose Future arguments aren't done yet
+        self._deferred: Optional[SimpleQueue] = None
+        self._submitter: Optional[threading.Thread] = None
 
     @abstractmethod
     def submit(self, task: Callable[..., R], *args, **kwargs) -> 'Future':
@@ -30,7 +34,7 @@ class PFascade(ContextManager, abc.ABC):
         returning a sequence in the same order as it.
         Equivalent to map(fcn,it) but in parallel
 
-        Default impl just calls submit() but subclass may do something more fancy.
+        Default impl submits the elements chunksize at a time, but subclass may do something more fancy.
         :param mapper Function to apply to each element in it
         :param it Sequence to apply fcn
         :param timeout Single-element timeout
@@ -39,8 +43,23 @@ class PFascade(ContextManager, abc.ABC):
         :return Fully-excuted result
         """
         fcn = as_fcn(mapper)
-        futures = [self.submit(partial(fcn, e, **kwargs)) for e in it]
-        return [f.result(timeout=timeout) for f in tqdm(futures)]
+        items = it if isinstance(it, Sequence) else list(it)
+        chunksize = chunksize or 1
+        # kwargs go through submit, so pools can resolve or share them, e.g., Processes' broadcast arrays
+        futures = [self.submit(_map_chunk, fcn, items[n:n + chunksize], **kwargs) for n in range(0, len(items), chunksize)]
+        # advance the progress bar as chunks finish, rather than stalling on whichever early one is slowest
+        index = {f: n for n, f in enumerate(futures)}
+        done = SimpleQueue()
+        for f in futures:
+            f.add_done_callback(done.put)
+        chunks = [None] * len(futures)
+        chunk_timeout = None if timeout is None else timeout * chunksize
+        with tqdm(total=len(items)) as progress:
+            for _ in range(len(futures)):
+                f = _next_done(done, chunk_timeout)
+                chunks[index[f]] = f.result()
+                progress.update(len(chunks[index[f]]))
+        return list(chain.from_iterable(chunks))
 
     def map_unordered(self, mapper: Mapper, it: Iterable[I], timeout: float = None, batch_size: int = None, **kwargs) -> Iterable[R]:
         """
@@ -58,21 +77,23 @@ class PFascade(ContextManager, abc.ABC):
         :return Iterable of results, in no particular order
         """
         fcn = as_fcn(mapper)
-        src = (self.submit(partial(fcn, e, **kwargs)) for e in it)
-        futures: Deque[Future] = deque()
-        popper = partial(pop_done, futures, timeout)
-        batch_size = max(batch_size or float('inf'), 1)
-
-        for f in src:
-            futures.append(f)
-            if len(futures) >= batch_size:
-                # for constrained batch sizes, check for done futures before adding any more
-                ff = popper()
-                assert ff != UNASSIGNED
-                yield ff
-        # all of src has been added to futures, so now we just drain the deque
-        while (ff := popper()) != UNASSIGNED:
-            yield ff
+        if kwargs:
+            fcn = partial(fcn, **kwargs)
+        # each future puts itself on the queue as it finishes, so the next result is always at the front
+        done = SimpleQueue()
+        outstanding = 0
+
+        for e in it:
+            self.submit(fcn, e).add_done_callback(done.put)
+            outstanding += 1
+            if batch_size and outstanding >= batch_size:
+                # for constrained batch sizes, wait for one to finish before adding any more
+                outstanding -= 1
+                yield _next_done(done, timeout).result()
+        # all of it has been submitted, so now we just drain what's outstanding
+        while outstanding:
+            outstanding -= 1
+            yield _next_done(done, timeout).result()
 
     @abstractmethod
     def broadcast(self, **kwargs) -> Optional[Mapping[str, 'Future']]:
@@ -84,20 +105,68 @@ class PFascade(ContextManager, abc.ABC):
     def __exit__(self, exc_type, exc_val, exc_tb):
         pass
 
-
-def pop_done(futures: Deque['Future'], timeout: float) -> R:
-    # First clean up empty slots
-    while futures and futures[0] == UNASSIGNED:
-        futures.popleft()
-    while futures:
-        # return first future we find that's actually done
-        for n, ff in enumerate(futures):
-            if ff != UNASSIGNED and ff.done():
-                futures[n] = UNASSIGNED
-                return ff.result(timeout=timeout)
-        # none done? sleep and try again!
-        time.sleep(0.1)
-    return UNASSIGNED  # indicates no more futures
+    def _submit_resolved(self, submit: Callable[..., 'Future'], task: Callable[..., R], args: tuple, kwargs: dict) -> 'Future':
+        """Calls submit with task and its args and kwargs, any Futures among them replaced by their results.
+        If any of those Futures aren't done yet, the submission is handed off to a background thread
+        so the caller isn't blocked waiting on them, and a Future of the eventual result is returned instead."""
+        futures = [a for a in chain(args, kwargs.values()) if isinstance(a, Future)] if args or kwargs else ()
+        if not futures:
+            # by far the most common case, so skip rebuilding args and kwargs
+            return submit(task, *args, **kwargs)
+        if all(f.done() for f in futures):
+            return submit(task, *resolve_args(args), **resolve_kwargs(kwargs))
+        if self._submitter is None:
+            self._deferred = SimpleQueue()
+            self._submitter = threading.Thread(target=self._submit_deferred, name=f"{type(self).__name__}-submitter", daemon=True)
+            self._submitter.start()
+        result = FloFuture()
+        self._deferred.put((submit, task, args, kwargs, result))
+        return result
+
+    def _submit_deferred(self):
+        while (deferred := self._deferred.get()) is not None:
+            submit, task, args, kwargs, result = deferred
+            try:
+                f = submit(task, *resolve_args(args), **resolve_kwargs(kwargs))
+            except BaseException as e:
+                result.set_exception(e)
+            else:
+                f.add_done_callback(partial(_copy_outcome, result))
+
+    def _stop_submitter(self):
+        """Waits for any deferred submissions to go through. Must be called before shutting down the pool."""
+        if self._submitter is not None:
+            self._deferred.put(None)
+            self._submitter.join()
+            self._submitter = None
+
+
+def resolve_args(args: tuple) -> tuple:
+    return tuple(a.result() if isinstance(a, Future) else a for a in args)
+
+
+def resolve_kwargs(kwargs: Mapping[str, Any]) -> Dict[str, Any]:
+    return {k: (a.result() if isinstance(a, Future) else a) for k, a in kwargs.items()}
+
+
+def _copy_outcome(result: 'FloFuture', f: concurrent.futures.Future):
+    if f.cancelled():
+        result.cancel()
+    elif f.exception() is not None:
+        result.set_exception(f.exception())
+    else:
+        result.set_result(f.result())
+
+
+def _map_chunk(fcn: Callable[..., R], chunk: Sequence[I], **kwargs) -> List[R]:
+    return [fcn(e, **kwargs) for e in chunk]
+
+
+def _next_done(done: SimpleQueue, timeout: float) -> 'Future':
+    try:
+        return done.get(timeout=timeout)
+    except Empty:
+        raise TimeoutError(f"No task completed within {timeout}s")
 
 
 class Future(abc.ABC):
@@ -202,3 +271,83 @@ class Done(Future):
 
     def exception(self, timeout=None) -> Exception:
         return self._exception
+
+
+class FloFuture(Future):
+    """Future completed by flo itself, via set_result or set_exception.
+    Unlike concurrent.futures.Future, which builds a Condition up front, it only creates an Event
+    once something actually blocks waiting on it, so it's cheap when consumed through callbacks."""
+    __slots__ = ('_lock', '_state', '_result', '_exception', '_callbacks', '_event')
+    _PENDING, _CANCELLED, _FINISHED = range(3)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = FloFuture._PENDING
+        self._result = None
+        self._exception = None
+        self._callbacks: Optional[List[Callable[['FloFuture'], None]]] = []
+        self._event: Optional[threading.Event] = None
+
+    def cancel(self) -> bool:
+        return self._finish(FloFuture._CANCELLED) or self._state == FloFuture._CANCELLED
+
+    def cancelled(self) -> bool:
+        return self._state == FloFuture._CANCELLED
+
+    def running(self) -> bool:
+        return False
+
+    def done(self) -> bool:
+        return self._state != FloFuture._PENDING
+
+    def add_done_callback(self, fn) -> None:
+        with self._lock:
+            if self._state == FloFuture._PENDING:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def result(self, timeout=None) -> R:
+        self._wait(timeout)
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None) -> Exception:
+        self._wait(timeout)
+        return self._exception
+
+    def set_result(self, result: R):
+        self._finish(FloFuture._FINISHED, result=result)
+
+    def set_exception(self, exception: BaseException):
+        self._finish(FloFuture._FINISHED, exception=exception)
+
+    def _wait(self, timeout: Optional[float]):
+        if self._state == FloFuture._PENDING:
+            with self._lock:
+                if self._state == FloFuture._PENDING and self._event is None:
+                    self._event = threading.Event()
+                event = self._event
+            if event is not None and not event.wait(timeout):
+                raise TimeoutError(f"Task didn't complete within {timeout}s")
+        if self._state == FloFuture._CANCELLED:
+            raise concurrent.futures.CancelledError()
+
+    def _finish(self, state: int, result: R = None, exception: BaseException = None) -> bool:
+        with self._lock:
+            if self._state != FloFuture._PENDING:
+                return False
+            self._result = result
+            self._exception = exception
+            self._state = state
+            callbacks, self._callbacks = self._callbacks, None
+            if self._event is not None:
+                self._event.set()
+        for fn in callbacks:
+            fn(self)
+        return True
+
+
+# futures from the stdlib executors behave just like ours, so they can also be passed as arguments to submit
+Future.register(concurrent.futures.Future)
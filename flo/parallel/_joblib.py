@@ -7,6 +7,7 @@ from joblib._parallel_backends import ImmediateResult
 
 from flo import as_fcn
 from flo.parallel import PFascade, Future, I, R, Done, Mapper
+from flo.parallel._fascade import resolve_args, resolve_kwargs
 
 
 class JobLibParallel(PFascade, ContextManager):
@@ -24,8 +25,9 @@ class JobLibParallel(PFascade, ContextManager):
                               prefer=prefer, require=require)
 
     def submit(self, task: Callable[[], R], *args, **kwargs) -> Future:
-        args = tuple(a.result() if isinstance(a, Future) else a for a in args)
-        kwargs = {k: (a.result() if isinstance(a, Future) else a) for k, a in kwargs.items()}
+        if args or kwargs:
+            args = resolve_args(args)
+            kwargs = resolve_kwargs(kwargs)
 
         if not self._exec._managed_backend:
             self._exec._initialize_backend()
@@ -41,7 +43,7 @@ class JobLibParallel(PFascade, ContextManager):
         return {k: Done(result=v) for k, v in kwargs.items()}
 
     def map_ordered(self, mapper: Mapper, it: Sequence[I], timeout: float = None, chunksize: int = 1, **kwargs) -> Sequence[R]:
-        if chunksize != self._exec.batch_size:
+        if chunksize is not None and chunksize != self._exec.batch_size:
             warnings.warn(f"{type(self).__name__} doesn't support a per-call chunksize. Please initialize with batch_size instead.")
 
         if timeout != self._exec.timeout:
@@ -1,15 +1,16 @@
+import sys
 import warnings
 from concurrent.futures import ProcessPoolExecutor
-from functools import partial
 from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
 from typing import *
 
-from flo import as_fcn
-from flo.parallel import PFascade, Future, I, R, Done, Mapper
+from flo.parallel import PFascade, Future, R, Done
 
 
 class Processes(PFascade, ContextManager):
     _exec: ProcessPoolExecutor
+    _shared: List[SharedMemory]
 
     def __init__(self, max_workers: int = None, mp_context: BaseContext = None, initializer: Callable[[], None] = None, initargs: tuple = ()):
         PFascade.__init__(self, max_workers)
@@ -17,26 +18,98 @@ class Processes(PFascade, ContextManager):
                                          mp_context=mp_context,
                                          initializer=initializer,
                                          initargs=initargs)
+        self._shared = []
 
     def submit(self, task: Callable[[], R], *args, **kwargs) -> Future:
-        args = tuple(a.result() if isinstance(a, Future) else a for a in args)
-        kwargs = {k: (a.result() if isinstance(a, Future) else a) for k, a in kwargs.items()}
-        return self._exec.submit(task, *args, **kwargs)
+        if self._shared and (args or kwargs):
+            args = tuple(map(_by_ref, args))
+            kwargs = {k: _by_ref(a) for k, a in kwargs.items()}
+        return self._submit_resolved(self._exec.submit, task, args, kwargs)
 
     def broadcast(self, **kwargs) -> Optional[Mapping[str, Future]]:
-        warnings.warn(f"{type(self).__name__} doesn't yet fully support the broadcast operation. "
-                      "Values 'broadcast' are just going to be sent via submit/map anyway.")
-        return {k: Done(result=v) for k, v in kwargs.items()}
+        """numpy arrays and bytes are placed in shared memory, so tasks they're passed to receive them by reference:
+        each worker attaches once, rather than every submit pickling a copy.
+        Workers see arrays as read-only. Shared memory is released when the pool exits."""
+        broadcast = {k: self._share(v) for k, v in kwargs.items()}
+        if not all(isinstance(v, SharedDone) for v in broadcast.values()):
+            warnings.warn(f"{type(self).__name__} can only broadcast numpy arrays and bytes. "
+                          "Other values 'broadcast' are just going to be sent via submit/map anyway.")
+        return broadcast
 
-    def map_ordered(self, mapper: Mapper, it: Sequence[I], timeout: float = None, chunksize: int = 1, **kwargs) -> Sequence[R]:
-        fcn = as_fcn(mapper)
-        if kwargs:
-            fcn = partial(fcn, **kwargs)
-        return list(self._exec.map(fcn, it, timeout=timeout, chunksize=chunksize))
+    def _share(self, value) -> Done:
+        np = sys.modules.get('numpy')
+        if isinstance(value, bytes) and value:
+            shm = SharedMemory(create=True, size=len(value))
+            shm.buf[:len(value)] = value
+            ref = _SharedRef(shm.name, len(value))
+        elif np is not None and isinstance(value, np.ndarray) and value.nbytes and not value.dtype.hasobject:
+            shm = SharedMemory(create=True, size=value.nbytes)
+            np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+            ref = _SharedRef(shm.name, value.nbytes, value.shape, value.dtype)
+        else:
+            return Done(result=value)
+        self._shared.append(shm)
+        return SharedDone(value, ref)
 
     def __enter__(self) -> 'Processes':
         self._exec.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        return self._exec.__exit__(exc_type, exc_val, exc_tb)
+        self._stop_submitter()
+        try:
+            return self._exec.__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            # the workers are gone, so nothing is attached anymore
+            for shm in self._shared:
+                shm.close()
+                shm.unlink()
+            self._shared.clear()
+
+
+class SharedDone(Done):
+    """A broadcast value that has also been placed in shared memory.
+    Its result is the value itself, but tasks it's passed to receive a reference to the shared copy."""
+
+    def __init__(self, value, ref: '_SharedRef'):
+        Done.__init__(self, result=value)
+        self.ref = Done(result=ref)
+
+
+def _by_ref(a):
+    return a.ref if isinstance(a, SharedDone) else a
+
+
+class _SharedRef(object):
+    """Pickles down to the name of a shared memory block, and unpickles into the value it holds"""
+    __slots__ = ('name', 'size', 'shape', 'dtype')
+
+    def __init__(self, name: str, size: int, shape: Tuple[int, ...] = None, dtype=None):
+        self.name = name
+        self.size = size
+        self.shape = shape
+        self.dtype = dtype
+
+    def __reduce__(self):
+        return _attach, (self.name, self.size, self.shape, self.dtype)
+
+
+# Within a worker, the values attached to so far, with the shared memory backing them
+_attached: Dict[str, Tuple[Optional[SharedMemory], Any]] = {}
+
+
+def _attach(name: str, size: int, shape: Optional[Tuple[int, ...]], dtype) -> Any:
+    attached = _attached.get(name)
+    if attached is None:
+        # Pool workers share the parent's resource tracker, so attaching doesn't hand them ownership of the block
+        shm = SharedMemory(name=name)
+        if shape is None:
+            attached = None, bytes(shm.buf[:size])
+            shm.close()
+        else:
+            import numpy as np
+            value = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            value.flags.writeable = False
+            attached = shm, value
+        _attached[name] = attached
+    return attached[1]
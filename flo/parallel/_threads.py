@@ -16,9 +16,7 @@ class Threads(PFascade, ContextManager):
                                         initargs=initargs)
 
     def submit(self, task: Callable[[], R], *args, **kwargs) -> Future:
-        args = tuple(a.result() if isinstance(a, Future) else a for a in args)
-        kwargs = {k: (a.result() if isinstance(a, Future) else a) for k, a in kwargs.items()}
-        return self._exec.submit(task, *args, **kwargs)
+        return self._submit_resolved(self._exec.submit, task, args, kwargs)
 
     def broadcast(self, **kwargs) -> Optional[Mapping[str, Future]]:
         return {k: Done(result=v) for k, v in kwargs.items()}
@@ -28,4 +26,5 @@ class Threads(PFascade, ContextManager):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop_submitter()
         return self._exec.__exit__(exc_type, exc_val, exc_tb)
@@ -2,11 +2,20 @@
 Functions related to file paths
 """
 import abc
+import codecs
+import locale
+import mmap
+import os
+import shutil
 import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from fnmatch import fnmatchcase
 from hashlib import md5
-from io import BufferedReader, DEFAULT_BUFFER_SIZE
+from io import BufferedReader
 from pathlib import Path, PurePath
+from queue import Queue, Empty
 from typing import *
 
 from flo.hashing import file_hash
@@ -19,6 +28,12 @@ PathLike = Union[str, Path, 'FloPath']
 
 PathType = TypeVar('PathType', bound='FloPath')
 
+# Threads for fetching the metadata ls prints of non-mounted paths
+LS_WORKERS = 32
+
+# Chunk size for streaming file contents. Much larger than io.DEFAULT_BUFFER_SIZE, to cut the number of syscalls
+COPY_BUF = 1 << 20
+
 
 def path_for(path: PathLike) -> 'FloPath':
     if isinstance(path, Path):
@@ -87,19 +102,20 @@ class FloPath(abc.ABC):
         dest = path_for(dest)
         total = 0
         with self.open('rb') as f, dest.open('wb') as d:
-            while True:
-                line = f.read(DEFAULT_BUFFER_SIZE)
-                if not line:
-                    return total
-                d.write(line)
-                total += len(line)
+            for chunk in read_ahead(f):
+                d.write(chunk)
+                total += len(chunk)
+        return total
 
     def from_lines(self) -> It[str]:
         return from_lines(self)
 
     def content_md5(self) -> str:
+        h = md5()
         with self.open('rb') as f:
-            return file_hash(f, md5)
+            for chunk in read_ahead(f):
+                h.update(chunk)
+        return h.hexdigest()
 
     @abc.abstractmethod
     def is_file(self) -> bool:
@@ -111,7 +127,28 @@ class FloPath(abc.ABC):
 
 
 class MountedPath(FloPath):
+    """Path on a mounted filesystem.
+    size(), mode(), and last_updated() share one stat, taken on first use and kept until refresh()
+    or until the file is opened for writing through this instance."""
     path: Path
+    _stat: Optional[os.stat_result]
+    _entry: Optional[os.DirEntry]
+
+    def __init__(self, path: Path, entry: os.DirEntry = None):
+        FloPath.__init__(self, path)
+        self._stat = None
+        self._entry = entry  # DirEntry this path was listed from, which may already have its stat
+
+    def stat(self) -> os.stat_result:
+        if self._stat is None:
+            self._stat = self._entry.stat() if self._entry is not None else self.path.stat()
+        return self._stat
+
+    def refresh(self) -> 'MountedPath':
+        """Forgets the cached stat, so subsequent metadata reflects the file as it is now"""
+        self._stat = None
+        self._entry = None
+        return self
 
     def with_path(self, path: PathLike) -> PathType:
         return MountedPath(Path(path))
@@ -125,18 +162,44 @@ class MountedPath(FloPath):
     def rglob(self, glob: str) -> Iterable[PathType]:
         return map(MountedPath, self.path.rglob(glob))
 
+    def scandir(self, recursive: bool = False) -> Iterator[os.DirEntry]:
+        """Entries of this directory, from os.scandir.
+        If recursive, those of all its subdirectories too, not descending into symlinked ones, as with rglob."""
+        pending = [self.path]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for e in entries:
+                    yield e
+                    if recursive and e.is_dir(follow_symlinks=False):
+                        pending.append(e.path)
+
     def size(self) -> int:
-        return self.path.stat().st_size
+        return self.stat().st_size
 
     def last_updated(self) -> datetime:
-        return datetime.fromtimestamp(self.path.stat().st_mtime)
+        return datetime.fromtimestamp(self.stat().st_mtime)
 
     def mode(self) -> int:
-        return self.path.stat().st_mode
+        return self.stat().st_mode
 
     def open(self, mode: str = 'rb', **kwargs) -> IO:
+        if mode.strip('rbt'):
+            self.refresh()  # about to write, so the cached stat will be out of date
         return self.path.open(mode, **kwargs)
 
+    def copy_to(self, dest: PathLike) -> int:
+        dest = path_for(dest)
+        if isinstance(dest, MountedPath):
+            # lets the OS copy in-kernel (e.g., copy_file_range/sendfile) without bouncing through python
+            shutil.copyfile(self.path, dest.path)
+            return dest.refresh().size()
+        return FloPath.copy_to(self, dest)
+
+    def content_md5(self) -> str:
+        # local reads are quick enough that hashlib.file_digest beats overlapping them with hashing
+        with self.open('rb') as f:
+            return file_hash(f, md5).hexdigest()
+
     def is_file(self) -> bool:
         return self.path.is_file()
 
@@ -170,19 +233,29 @@ def ls(directory: PathLike, recursive: bool = False, glob: str = '*', sort_key:
     :return A sequence of the contents of the directory. Only arguments recursive, glob, and sort_key impact the return value.
     """
     directory = path_for(directory)
-    src = directory.rglob(glob) if recursive else directory.glob(glob)
+    if isinstance(directory, MountedPath) and '/' not in glob and '**' not in glob:
+        # a scandir pass per directory, whose entries come with their stat, rather than a glob and a stat per column
+        src = [MountedPath(Path(e.path), e) for e in directory.scandir(recursive) if fnmatchcase(e.name, glob)]
+    else:
+        src = directory.rglob(glob) if recursive else directory.glob(glob)
     if not print_hidden:
-        src = filter(lambda p: not p.name.startswith('.'), src)
+        src = filter(lambda p: not p.path.name.startswith('.'), src)
     contents = sorted(src, key=as_fcn(sort_key)) if sort_key else list(src)
 
     columns = []
-    if print_mode:
-        columns.append(['Mode', *(stat.filemode(p.mode()) for p in contents)])
-    if print_size:
-        sizes = ['Size', *(sizestr(p.size()) if p.is_file() else '----' for p in contents)]
-        columns.append(sizes)
-    if print_updated:
-        columns.append(['Updated', *map(lambda p: f"{p.last_updated():%Y-%m-%d %H:%M:%S}", contents)])
+    if print_mode or print_size or print_updated:
+        if isinstance(directory, MountedPath):
+            info = list(map(_ls_info, contents))
+        else:
+            # remote metadata lookups are latency-bound, so overlap them
+            with ThreadPoolExecutor(max_workers=LS_WORKERS) as pool:
+                info = list(pool.map(_ls_info, contents))
+        if print_mode:
+            columns.append(['Mode', *(stat.filemode(mode) for mode, _, _ in info)])
+        if print_size:
+            columns.append(['Size', *(sizestr(size) if size is not None else '----' for _, size, _ in info)])
+        if print_updated:
+            columns.append(['Updated', *(f"{updated:%Y-%m-%d %H:%M:%S}" for _, _, updated in info)])
     columns.append(['Path', *(p.relative_to(directory).as_posix() for p in contents)])
 
     col_size = [min(max(map(len, col)), 120 // len(columns)) for col in columns]
@@ -192,13 +265,31 @@ def ls(directory: PathLike, recursive: bool = False, glob: str = '*', sort_key:
             print(*("-" * s for c, s in zip(row, col_size)))
         elif (n % 80) == 0:
             input('---More---')
+    return contents
+
+
+def _ls_info(p: FloPath) -> Tuple[int, Optional[int], datetime]:
+    """The mode, size (None if not a file), and last update of p, from as few stat calls as possible"""
+    if not isinstance(p, MountedPath):
+        return p.mode(), p.size() if p.is_file() else None, p.last_updated()
+    st = p.stat()
+    return st.st_mode, st.st_size if stat.S_ISREG(st.st_mode) else None, datetime.fromtimestamp(st.st_mtime)
 
 
 def from_lines(path: PathLike) -> It[str]:
     def src() -> Iterator[str]:
-        with path_for(path).open('rt') as f:
+        p = path_for(path)
+        # splitting raw utf-8 bytes on newlines is safe, so let the kernel page the file in instead of reading it.
+        # Only regular files can be mapped, and opening anything else, like a fifo, may block or consume it
+        if isinstance(p, MountedPath) and codecs.lookup(locale.getpreferredencoding(False)).name == 'utf-8' \
+                and stat.S_ISREG(p.stat().st_mode):
+            with p.path.open('rb') as f:
+                yield from _mapped_lines(f)
+            return
+        # bigger reads than the default, so large files take fewer syscalls
+        with (p.open('rt', buffering=COPY_BUF) if isinstance(p, MountedPath) else p.open('rt')) as f:
             if not hasattr(f, 'readline'):
-                f = BufferedReader(f)
+                f = BufferedReader(f, buffer_size=COPY_BUF)
             while True:
                 line = f.readline()
                 if not line:
@@ -208,6 +299,54 @@ def from_lines(path: PathLike) -> It[str]:
     return from_(src())
 
 
+def _mapped_lines(f: IO[bytes]) -> Iterator[str]:
+    """Lines of the utf-8 file f, read via mmap, with newlines translated as in text mode"""
+    if os.fstat(f.fileno()).st_size == 0:
+        return  # can't mmap an empty file
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for line in iter(mm.readline, b''):
+            if b'\r' in line:
+                # text mode treats \r\n and a lone \r as line endings too, which bytes.splitlines matches
+                for part in line.splitlines(keepends=True):
+                    body = part.rstrip(b'\r\n')
+                    yield body.decode() + ('\n' if len(body) < len(part) else '')
+            else:
+                yield line.decode()
+
+
 def content_md5(path: PathLike) -> str:
-    with path_for(path).open('rb') as f:
-        return file_hash(f, md5)
+    return path_for(path).content_md5()
+
+
+def read_ahead(f: IO[bytes], chunk_size: int = COPY_BUF, depth: int = 2) -> Iterator[bytes]:
+    """Yields the contents of f in chunks, reading up to depth chunks ahead in a background thread
+    so that waiting on reads overlaps with whatever the caller does with each chunk.
+    File reads, hashing, and writes all release the GIL, so they can genuinely proceed in parallel."""
+    chunks = Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def read():
+        try:
+            while not stopped.is_set():
+                chunk = f.read(chunk_size)
+                chunks.put(chunk)
+                if not chunk:
+                    return
+        except BaseException as e:
+            chunks.put(e)
+
+    reader = threading.Thread(target=read, name='flo-read-ahead', daemon=True)
+    reader.start()
+    try:
+        while chunk := chunks.get():
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+    finally:
+        # make sure the reader is done with f before the caller closes it
+        stopped.set()
+        while reader.is_alive():
+            try:
+                chunks.get_nowait()  # unblock it if it's waiting on a full queue
+            except Empty:
+                reader.join(0.01)
@@ -1,11 +1,13 @@
 """ Fluent api for pandas"""
-from operator import eq, ne, gt, ge, lt, le
-from typing import Set, Any, Callable, Literal, TypeVar
+from functools import partial
+from operator import eq, ne, gt, ge, lt, le, attrgetter
+from typing import Set, Any, Callable, Literal, TypeVar, List, Optional
 
+import numpy as np
 import pandas as pd
 
 from flo.it2 import Filter
-from flo.lamb import as_fcn, UNASSIGNED, interpret_between
+from flo.lamb import as_fcn, UNASSIGNED, interpret_between, vectorizes, Lambda, _call
 
 SeriesOperator = Callable[[pd.Series, Any], pd.Series]
 T = TypeVar('T')
@@ -28,9 +30,50 @@ def ds_without(self: pd.Series, value) -> pd.Series:
     return ds_op(self, ne, value)
 
 
-# noinspection PyTypeChecker
+def _str_method(condition: Filter) -> Optional[Callable[[pd.Series], pd.Series]]:
+    """If condition is a Lambda calling a string method on each element, e.g., e_.startswith('b'),
+    returns the equivalent call on a Series' .str accessor"""
+    lamb = condition if type(condition) is Lambda else getattr(condition, '__self__', None)
+    if type(lamb) is not Lambda or len(lamb._chain) != 2:
+        return None
+    get, call = lamb._chain
+    if not isinstance(get, attrgetter) or not isinstance(call, partial) or call.func is not _call:
+        return None
+    name = get.__reduce__()[1]
+    if len(name) != 1 or name[0] not in _STR_PREDICATES:
+        return None
+    args, kwargs = call.keywords['args'], call.keywords['kwargs']
+    # pandas' signatures only match str's for these, e.g., .str.startswith's second argument is na, not start
+    if kwargs or len(args) != _STR_PREDICATES[name[0]] or not all(isinstance(a, str) for a in args):
+        return None
+    return lambda ds: getattr(ds.str, name[0])(*args)
+
+
+# number of arguments each predicate can be vectorized with
+_STR_PREDICATES = {'startswith': 1, 'endswith': 1, 'isalnum': 0, 'isalpha': 0, 'isdigit': 0, 'isspace': 0,
+                   'islower': 0, 'isupper': 0, 'istitle': 0, 'isnumeric': 0, 'isdecimal': 0}
+
+
+def _mask(ds: pd.Series, condition: Filter) -> pd.Series:
+    """Evaluates condition for each element of ds. Conditions known to vectorize, like e_ > 3, np.isnan or
+    e_.startswith('b') on strings, are applied to the whole Series at once.
+    Anything else, e.g., a plain python lambda, goes through ds.apply."""
+    f = as_fcn(condition)
+    whole = f if vectorizes(condition) else _str_method(condition) if ds.dtype == object else None
+    if whole is not None:
+        try:
+            mask = whole(ds)
+            # e.g., .str gives NaN rather than a bool for non-strings, so then leave it to the element-wise path
+            if mask.dtype == bool and len(mask) == len(ds):
+                return mask
+        except Exception:
+            pass  # e.g., a comparison pandas refuses to broadcast, so leave it to the element-wise path
+    # noinspection PyTypeChecker
+    return ds.apply(f)
+
+
 def ds_only_if(self: pd.Series, condition: Filter) -> pd.Series:
-    return self[self.apply(as_fcn(condition))]
+    return self[_mask(self, condition)]
 
 
 def ds_only_in(self: pd.Series, included: Set) -> pd.Series:
@@ -139,9 +182,11 @@ def monkey_patch_ds(series_type: type = pd.Series):
 def df_op(self: pd.DataFrame, op: Literal['==', '<=', '!=', '<', '>', '>='], **kwargs) -> pd.DataFrame:
     if all(isinstance(v, (str, float, int)) for v in kwargs.values()):
         # Oddly, a string query is faster than a series of filters
-        # because pandas doesn't have to expose a python object at each step
+        # because pandas doesn't have to expose a python object at each step.
+        # Evaluating it to a mask directly skips the extra frame handling that DataFrame.query does on top.
+        # Like query, eval uses numexpr if it's installed.
         query = ' & '.join(f"{key}{op}{repr(val)}" for key, val in kwargs.items())
-        return self.query(query)
+        return self[self.eval(query)]
     # else fall back to series of filters
     f = True
     opf = op_by_str[op]
@@ -164,22 +209,24 @@ def df_without(self: pd.DataFrame, **kwargs) -> pd.DataFrame:
 def df_only_if(self: pd.DataFrame, **kwargs: Filter) -> pd.DataFrame:
     df = self
     for key, val in kwargs.items():
-        df = df[df[key].apply(as_fcn(val))]
+        df = df[_mask(df[key], val)]
     return df
 
 
+def _all(masks: List[np.ndarray]) -> np.ndarray:
+    return masks[0] if len(masks) == 1 else np.logical_and.reduce(masks)
+
+
 def df_only_in(self: pd.DataFrame, **kwargs: Set) -> pd.DataFrame:
-    f = True
-    for key, val in kwargs.items():
-        f &= self[key].isin(val)
-    return self[f]
+    if not kwargs:
+        return self
+    return self[_all([self[key].isin(val).values for key, val in kwargs.items()])]
 
 
 def df_not_in(self: pd.DataFrame, **kwargs: Set) -> pd.DataFrame:
-    f = True
-    for key, val in kwargs.items():
-        f &= ~self[key].isin(val)
-    return self[f]
+    if not kwargs:
+        return self
+    return self[_all([~self[key].isin(val).values for key, val in kwargs.items()])]
 
 
 def df_gt(self: pd.DataFrame, **kwargs) -> pd.DataFrame:
@@ -1,9 +1,18 @@
 """
 Code related to reusable pipelines-- sequences of map/filter/reduce methods to apply to iterables
 """
+import os
+from collections import defaultdict
+from functools import partial
 from typing import *
-from itertools import chain, dropwhile, takewhile
-from .lamb import Lambda, as_name_function, e_, as_fcn, kwarg_str
+from itertools import chain, dropwhile, takewhile, filterfalse
+from .lamb import Lambda, as_name_function, as_fcn, kwarg_str, UNASSIGNED
+
+# Set FLO_TRACE=1 to have failures while iterating a pipeline report the item and pipeline they failed in.
+# Counting items costs a little per element, so it's off by default.
+TRACE = os.environ.get('FLO_TRACE', '') not in ('', '0')
+# Set FLO_NO_LABELS=1 to skip building the descriptive labels of pipeline steps, e.g., for pipelines built per row
+LABELS = os.environ.get('FLO_NO_LABELS', '') in ('', '0')
 
 _E = TypeVar('_E')  # Iterator element type
 _R = TypeVar('_R')  # return type
@@ -24,16 +33,144 @@ def pipeline(label: str = '') -> 'Pipeline[_E,_R]':
     return Pipeline(label, ())
 
 
+class ElementStep(object):
+    """A Transform that applies fcn to each element independently,
+    either mapping it (kind 'map'), keeping it if fcn passes (kind 'filter') or dropping it if fcn passes (kind 'exclude').
+    Unlike an opaque Transform, a run of ElementSteps can be fused into a single loop."""
+    kind: str
+    fcn: Function
+
+    def __init__(self, kind: str, fcn: Function):
+        self.kind = kind
+        self.fcn = fcn
+
+    def __call__(self, it: Iterable[_E]) -> Iterable[_R]:
+        # the builtin iterators skip a python frame per element
+        if self.kind == 'map':
+            return map(self.fcn, it)
+        if self.kind == 'filter':
+            return filter(self.fcn, it)
+        return filterfalse(self.fcn, it)
+
+
+_FUSED_STEP = {'map': "e = f{n}(e)", 'filter': "if not f{n}(e): continue", 'exclude': "if f{n}(e): continue"}
+_FUSED_LAST = {'map': "yield f{n}(e)", 'filter': "if f{n}(e): yield e", 'exclude': "if not f{n}(e): yield e"}
+
+
+def fuse(steps: Sequence[ElementStep]) -> Transform:
+    """Generates a single generator function that applies all the steps in one loop, e.g.,
+    def _fused(src, f0=f0, f1=f1, f2=f2):
+        for e in src:
+            e = f0(e)
+            if not f1(e): continue
+            yield f2(e)
+    The functions are bound as default arguments so the loop looks them up as fast locals rather than globals.
+    """
+    namespace = {f"f{n}": step.fcn for n, step in enumerate(steps)}
+    params = ''.join(f", {name}={name}" for name in namespace)
+    lines = [f"def _fused(src{params}):", "    for e in src:"]
+    for n, step in enumerate(steps[:-1]):
+        lines.append("        " + _FUSED_STEP[step.kind].format(n=n))
+    last = len(steps) - 1
+    lines.append("        " + _FUSED_LAST[steps[last].kind].format(n=last))
+    exec(compile('\n'.join(lines), '<flo-fused>', 'exec'), namespace)
+    return namespace['_fused']
+
+
+def _fuse_runs(steps: Sequence[Transform]) -> Tuple[Transform]:
+    """Replaces each run of consecutive ElementSteps with a single fused Transform.
+    A lone ElementStep is left as is, since a builtin map or filter beats a generated loop of one step."""
+    fused, run = [], []
+
+    def flush():
+        try:
+            fused.append(run[0] if len(run) == 1 else fuse(run))
+        except Exception:
+            # fusing is only an optimization, so fall back to chaining the steps' own iterators
+            fused.extend(run)
+        run.clear()
+
+    for step in steps:
+        if isinstance(step, ElementStep):
+            run.append(step)
+            continue
+        if run:
+            flush()
+        fused.append(step)
+    if run:
+        flush()
+    return tuple(fused)
+
+
+def _flatmap(f: Function, it: Iterable[_E]) -> Iterable[_R]:
+    return chain.from_iterable(map(f, it))
+
+
+_BUILTIN_COLLECTORS = frozenset((list, set, frozenset, dict, tuple, sum, min, max))
+
+
+def _is_builtin_collector(f: Callable) -> bool:
+    try:
+        if f in _BUILTIN_COLLECTORS:
+            return True
+    except TypeError:  # unhashable
+        return False
+    # e.g., ''.join
+    instance = getattr(f, '__self__', None)
+    return type(instance) is str and instance == '' and getattr(f, '__name__', None) == 'join'
+
+
+def _name_function(f: Union[Lambda, Callable]) -> Tuple[str, Callable]:
+    if LABELS:
+        return as_name_function(f)
+    return '', f.f if isinstance(f, Lambda) else f
+
+
+def _source_label(it: Iterable) -> str:
+    """e.g., list[3]"""
+    if not LABELS:
+        return ''
+    # probing for __len__ is cheaper than isinstance(it, Sized), which goes through ABCMeta
+    return f"{type(it).__name__}[{len(it) if hasattr(it, '__len__') else '?'}]"
+
+
+def _kwarg_str(kwargs: Mapping[str, Any]) -> str:
+    return kwarg_str(kwargs) if LABELS else ''
+
+
+def _apply_steps(steps: Tuple[Transform, ...], it: Iterable[_E]) -> Iterable[_R]:
+    for step in steps:
+        it = step(it)
+    return it
+
+
+def _collect(first: Collector, rest: Tuple[Callable, ...], it: Iterable[_E]) -> _C:
+    c = first(it)
+    for transform in rest:
+        c = transform(c)
+    return c
+
+
 class Pipeline(Generic[_E, _R]):
-    label: str
+    __slots__ = ('_label_parts', 'steps', '_compiled', '_composed')
+    _label_parts: Tuple[str, ...]
     steps: Tuple[Transform]
+    _compiled: Tuple[Transform]
+    _composed: Transform
 
-    def __init__(self, label: str, steps: Tuple[Transform]):
-        self.label = label
+    def __init__(self, label: Union[str, Tuple[str, ...]], steps: Tuple[Transform]):
+        """:param label The pipeline's label, or the parts of it to join with spaces once it's needed"""
+        self._label_parts = label if isinstance(label, tuple) else (label,)
         self.steps = steps
+        self._compiled = UNASSIGNED
+        self._composed = None
+
+    @property
+    def label(self) -> str:
+        return ' '.join(self._label_parts)
 
     def _with(self, additional_label: str, additional_step: Transform) -> 'Pipeline[_E,_R1]':
-        return Pipeline(f"{self.label} {additional_label}", tuple((*self.steps, additional_step)))
+        return Pipeline(self._label_parts + (additional_label,), self.steps + (additional_step,))
 
     def map(self, mapper: Mapper, **kwargs) -> 'Pipeline[_E,_R1]':
         """Apply mapper to each element of the iterable.
@@ -41,8 +178,10 @@ class Pipeline(Generic[_E, _R]):
         :param: mapper Any Lambda or function that takes an element and returns something new of type _R
         :returns A new pipeine that adds this mapper
         """
-        label, f = as_name_function(mapper)
-        return self._with(f"* {label}{kwarg_str(kwargs)}", lambda it: (f(e, **kwargs) for e in it))
+        label, f = _name_function(mapper)
+        if kwargs:
+            f = partial(f, **kwargs)
+        return self._with(f"* {label}{_kwarg_str(kwargs)}", ElementStep('map', f))
 
     def filter(self, true_condition: Filter, **kwargs) -> 'Pipeline[_E,_E]':
         """Filter elements of the iterable to only those that pass this true_condition test.
@@ -50,8 +189,10 @@ class Pipeline(Generic[_E, _R]):
         :param: true_condition Any Lambda or function that takes an element and returns something boolean-like
         :returns A new pipeline that adds this filter
         """
-        label, f = as_name_function(true_condition)
-        return self._with(f"/ {label.lstrip()}{kwarg_str(kwargs)}", lambda it: (e for e in it if f(e, **kwargs)))
+        label, f = _name_function(true_condition)
+        if kwargs:
+            f = partial(f, **kwargs)
+        return self._with(f"/ {label.lstrip()}{_kwarg_str(kwargs)}", ElementStep('filter', f))
 
     def exclude(self, excluded_condition: Filter, **kwargs) -> 'Pipeline[_E,_E]':
         """Filter out elements of the iterable that pass this condition.
@@ -59,32 +200,41 @@ class Pipeline(Generic[_E, _R]):
         :param: excluded_condition Any Lambda or function that takes an element and returns something boolean-like
         :returns A new pipeline that adds this filter
         """
-        label, f = as_name_function(excluded_condition)
-        return self._with(f"/ not {label.lstrip()}{kwarg_str(kwargs)}", lambda it: (e for e in it if not f(e, **kwargs)))
+        label, f = _name_function(excluded_condition)
+        if kwargs:
+            f = partial(f, **kwargs)
+        return self._with(f"/ not {label.lstrip()}{_kwarg_str(kwargs)}", ElementStep('exclude', f))
 
     def flatten(self) -> 'Pipeline[Iterable[_E],_E]':
         """
         Flattens an iterator of iterators into an iterator of elements
         """
-        return self._with("* flatten", lambda it: (e for ee in it for e in ee))
+        return self._with("* flatten", chain.from_iterable)
 
     def flatmap(self, mapper: Mapper, **kwargs) -> 'Pipeline[_E,_R]':
-        """Shorthand for self.map(mapper,**kwargs).flatten()"""
-        return self.map(mapper, **kwargs).flatten()
+        """Shorthand for self.map(mapper,**kwargs).flatten(), as a single step"""
+        label, f = _name_function(mapper)
+        if kwargs:
+            f = partial(f, **kwargs)
+        return self._with(f"* {label}{_kwarg_str(kwargs)} * flatten", partial(_flatmap, f))
 
     def zip_with(self, it: Iterable[_R]) -> 'Pipeline[_E,Tuple[_E,_R]]':
-        return self._with(f"zip({type(it)}[{len(it) if isinstance(it, Sized) else '?'}]", lambda e: zip(e, it))
+        return self._with(f"zip({_source_label(it)})", lambda e: zip(e, it))
 
     def chain(self, it: Iterable[_E]) -> 'Pipeline[_E,_E]':
-        return self._with(f"chain({type(it)}[{len(it) if isinstance(it, Sized) else '?'}]", lambda e: chain(e, it))
+        return self._with(f"chain({_source_label(it)})", lambda e: chain(e, it))
 
     def dropwhile(self, condition: Filter, **kwargs) -> 'Pipeline[_E,_E]':
-        label, f = as_name_function(condition)
-        return self._with(f"dropwhile({label.lstrip()}{kwarg_str(kwargs)}", lambda it: dropwhile(f, it))
+        label, f = _name_function(condition)
+        if kwargs:
+            f = partial(f, **kwargs)
+        return self._with(f"dropwhile({label.lstrip()}{_kwarg_str(kwargs)}", lambda it: dropwhile(f, it))
 
     def takewhile(self, condition: Filter, **kwargs) -> 'Pipeline[_E,_E]':
-        label, f = as_name_function(condition)
-        return self._with(f"takewhile({label.lstrip()}{kwarg_str(kwargs)}", lambda it: takewhile(f, it))
+        label, f = _name_function(condition)
+        if kwargs:
+            f = partial(f, **kwargs)
+        return self._with(f"takewhile({label.lstrip()}{_kwarg_str(kwargs)}", lambda it: takewhile(f, it))
 
     def collect(self, collector: Collector, *collectors: Collector, **kwargs) -> 'TerminatedPipeline[_E,_R]':
         """Drain the elements from the iterable into the collector function(s).
@@ -96,24 +246,69 @@ class Pipeline(Generic[_E, _R]):
             kwargs are only passed to the first reducer
         :return TerminatedPipeline with this collector at the end
         """
-        label, f = as_name_function(collector)
+        label, f = _name_function(collector)
         if kwargs:
-            label += kwarg_str(kwargs)
-        fcn = e_.apply(f, **kwargs)
-        for c in collectors:
-            fcn = fcn.apply(as_fcn(c))
-        return TerminatedPipeline(self, f"> {label}", fcn.f)
+            label += _kwarg_str(kwargs)
+        first = partial(f, **kwargs) if kwargs else f
+        rest = tuple(as_fcn(c) for c in collectors)
+        transform = partial(_collect, first, rest) if rest else first
+        return TerminatedPipeline(self, f"> {label}", transform, raw=_is_builtin_collector(f))
+
+    def compile(self) -> Tuple[Transform]:
+        """Returns the steps of this pipeline with each run of map/filter/exclude steps fused into one loop.
+        The result is cached, so reapplying the pipeline only pays for fusing once."""
+        if self._compiled is UNASSIGNED:
+            self._compiled = _fuse_runs(self.steps)
+        return self._compiled
+
+    def to_numba(self, dtype) -> Optional[Callable[['np.ndarray'], 'np.ndarray']]:
+        """If this pipeline is purely numeric (maps and filters of Lambda arithmetic and comparisons against constants),
+        returns a numba-compiled function applying it to a 1-d array of dtype and returning the resulting array.
+        Returns None if numba isn't installed or the pipeline doesn't qualify, in which case use apply instead."""
+        from ._numba_backend import kernel_for_dtype
+        return kernel_for_dtype(self, dtype)
+
+    def materialize(self, src: Iterable[_E], dtype) -> 'np.ndarray':
+        """Applies this pipeline to src and collects the result into a 1-d numpy array of dtype.
+        Numeric pipelines over arrays run in a compiled kernel when numba is available, and otherwise the
+        elements are drained by numpy's own loop rather than a python generator."""
+        import numpy as np
+        kernel = self.to_numba(src.dtype) if isinstance(src, np.ndarray) and src.ndim == 1 else None
+        if kernel is not None:
+            return kernel(src).astype(dtype, copy=False)
+        # a pipeline of only maps keeps every element, so the output can be allocated up front
+        count = len(src) if isinstance(src, Sized) and all(
+            isinstance(step, ElementStep) and step.kind == 'map' for step in self.steps) else -1
+        return np.fromiter(self._raw_iter(src), dtype, count=count)
+
+    def _compose(self) -> Transform:
+        """The compiled steps as a single Transform, built once per pipeline"""
+        if self._composed is None:
+            steps = self.compile()
+            if not steps:
+                self._composed = iter
+            elif len(steps) == 1:
+                self._composed = steps[0]
+            else:
+                self._composed = partial(_apply_steps, steps)
+        return self._composed
+
+    def _raw_iter(self, it: Iterable[_E]) -> Iterator[_R]:
+        """Applies this pipeline to it without apply's diagnostics for failed iteration"""
+        return iter(self._compose()(it))
 
     def apply(self, it: Iterable[_E]) -> Iterator[_R]:
-        n = -1
+        """Applies this pipeline to it. With TRACE on, errors report which item and pipeline they happened in."""
+        return self._debug_apply(it) if TRACE else self._raw_iter(it)
+
+    def _debug_apply(self, it: Iterable[_E]) -> Iterator[_R]:
+        n = 0  # items yielded so far, counted with a plain int rather than enumerate's (n, e) tuples
         try:
-            transformed = it
-            for step in self.steps:
-                transformed = step(transformed)
-            for n, e in enumerate(transformed):
+            for e in self._raw_iter(it):
                 yield e
+                n += 1
         except Exception as ee:
-            raise type(ee)(f"Failed to iterate to item {n + 1} in flo.Pipeline({self.label})", ee)
+            raise type(ee)(f"Failed to iterate to item {n} in flo.Pipeline({self.label})", ee)
 
     def __call__(self, it: Iterable[_E]) -> Iterator[_R]:
         return self.apply(it)
@@ -141,17 +336,27 @@ class Pipeline(Generic[_E, _R]):
 
 
 class TerminatedPipeline(Generic[_E, _C]):
-    label: str
+    __slots__ = ('_additional_label', 'pipeline', 'transform', 'raw')
+    _additional_label: str
     pipeline: Pipeline[_E, _R]
     transform: TerminalTranform
+    raw: bool
 
-    def __init__(self, pipeline: Pipeline[_E, _R], additional_label: str, transform: TerminalTranform):
-        self.label = f"{pipeline.label} {additional_label}"
+    def __init__(self, pipeline: Pipeline[_E, _R], additional_label: str, transform: TerminalTranform,
+                 raw: bool = False):
+        """:param raw If True and TRACE is off, transform is drained straight from the pipeline's iterator.
+            Worthwhile when transform starts with a builtin like list, whose own cost per element is tiny."""
+        self._additional_label = additional_label
         self.pipeline = pipeline
         self.transform = transform
+        self.raw = raw
+
+    @property
+    def label(self) -> str:
+        return f"{self.pipeline.label} {self._additional_label}"
 
     def __call__(self, it: Iterable[_E]) -> _C:
-        piped = self.pipeline(it)
+        piped = self.pipeline._raw_iter(it) if self.raw and not TRACE else self.pipeline(it)
         return self.transform(piped)
 
     def __repr__(self) -> str:
@@ -164,33 +369,35 @@ class TerminatedPipeline(Generic[_E, _C]):
 def index(it: Iterator[_E], key: Mapper, **kwargs) -> Mapping[_R, Sequence[_E]]:
     label, f = as_name_function(key)
     kwargstr = kwarg_str(kwargs)
-    d = {}
+    if kwargs:
+        f = partial(f, **kwargs)
+    d = defaultdict(list)
     e = None
     try:
         for e in it:
-            k = f(e, **kwargs)
-            v = d.get(k)
-            if v is None:
-                v = []
-                d[k] = v
-            v.append(e)
+            d[f(e)].append(e)
     except Exception as ee:
         raise type(ee)(f"Failed to index {it} with {label}({e}{kwargstr})", ee)
 
-    return d
+    return dict(d)
 
 
 def unique_index(it: Iterator[_E], key: Mapper, **kwargs) -> Mapping[_R, _E]:
     label, f = as_name_function(key)
     kwargstr = kwarg_str(kwargs)
+    if kwargs:
+        f = partial(f, **kwargs)
     d = {}
+    setdefault = d.setdefault
     e = None
     try:
         for e in it:
-            k = f(e, **kwargs)
-            if k in d:
+            k = f(e)
+            n = len(d)
+            # a single probe both inserts new keys and detects existing ones, which leave d unchanged
+            setdefault(k, e)
+            if len(d) == n:
                 raise KeyError(f"Non-unique keys for {label}({e}{kwargstr}) = {k}")
-            d[k] = e
     except Exception as ee:
         raise type(ee)(f"Failed to index {it} with {label}({e}{kwargstr})", ee)
 
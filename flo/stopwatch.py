@@ -1,13 +1,27 @@
 import time
+from collections import defaultdict
 from datetime import timedelta
 from functools import wraps
 from typing import *
 
 
+# total seconds spent in each @timed function, by function name
+timings: DefaultDict[str, float] = defaultdict(float)
+
+
 def timed(fcn):
-    @wraps
+    """Decorator accumulating the time spent in fcn into timings, under its module and qualified name.
+    Unlike timeit, it doesn't build or log a StopWatch per call, so it's cheap enough for hot functions."""
+    # qualified, so same-named functions like two classes' __call__ don't share an entry
+    name = f"{fcn.__module__}.{fcn.__qualname__}"
+
+    @wraps(fcn)
     def wrapper(*args, **kwargs):
-        return timeit(fcn, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fcn(*args, **kwargs)
+        finally:
+            timings[name] += time.perf_counter() - start
 
     return wrapper
 
@@ -17,15 +31,22 @@ def timeit(fcn, *args, **kwargs):
         return fcn(*args, **kwargs)
 
 
-class StopWatch(ContextManager):
+class StopWatch(object):
+    # a plain ContextManager by its __enter__ and __exit__; subclassing it would bring back a __dict__
+    __slots__ = ('_label', '_start', '_stop', '_laps', '_verbose')
     _label: str
-    _start: float = None
-    _stop: float = None
+    _start: Optional[float]
+    _stop: Optional[float]
     _laps: List['StopWatch']
+    _verbose: bool
 
-    def __init__(self, label: str = 'StopWatch'):
+    def __init__(self, label: str = 'StopWatch', verbose: bool = True):
+        """:param verbose If True, log the timings when stopped"""
         self._label = label
+        self._start = None
+        self._stop = None
         self._laps = []
+        self._verbose = verbose
 
     def start(self) -> 'StopWatch':
         self._start = time.perf_counter()
@@ -35,29 +56,35 @@ class StopWatch(ContextManager):
         if self._start is None:
             raise ValueError('Called stop before start')
         self._stop = time.perf_counter()
-        self.log()
-        return self.duration()
+        if self._verbose:
+            self.log()
+        return self._stop - self._start
 
     def duration(self) -> float:
         if self._start is None:
             raise ValueError('Called stop before start')
-        return (self._stop or time.perf_counter()) - self._start
+        return (self._stop if self._stop is not None else time.perf_counter()) - self._start
 
     def log(self, logger: Callable[[str], None] = print, prefix: str = "") -> str:
-        if not self._start:
+        if self._start is None:
             msg = f"{prefix}{self._label}: NOT STARTED"
         else:
             msg = f"{prefix}{self._label}: {timedelta(seconds=self.duration())}"
-            if not self._stop:
+            if self._stop is None:
                 msg += " RUNNING"
         logger(msg)
         for l in self._laps:
             l.log(logger, prefix=prefix + '|-')
+        return msg
 
     def lap(self, label: str) -> 'StopWatch':
-        l = StopWatch(label)
+        """Records the time since the previous lap (or the start) as a lap, which is logged along with this StopWatch"""
+        now = time.perf_counter()
+        if self._start is None:
+            raise ValueError('Called lap before start')
+        l = StopWatch(label, verbose=False)
         l._start = self._laps[-1]._stop if self._laps else self._start
-        l.stop()
+        l._stop = now
         self._laps.append(l)
         return l
 
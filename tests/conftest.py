@@ -0,0 +1,19 @@
+import multiprocessing
+import sys
+
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: integration tests with a large fixed cost, deselect with -m "not slow"')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def fast_worker_start():
+    """Where new processes are spawned by default (macOS), every worker re-imports numpy, pandas and flo.
+    Serve them from a forkserver that has already imported those instead. Where fork is the default, it's already
+    as fast, and windows has neither."""
+    if sys.platform != 'win32' and multiprocessing.get_start_method() == 'spawn':
+        multiprocessing.set_forkserver_preload(['numpy', 'pandas', 'flo'])
+        multiprocessing.set_start_method('forkserver', force=True)
+    yield
@@ -1,11 +1,12 @@
 import logging
+import pickle
 from io import StringIO
 from typing import Tuple, Any, Type
 
 import pytest
 from flo.lamb import e_
 
-from flo.attempt import try_, Attempt
+from flo.attempt import try_, Attempt, Success, Failure
 
 
 @pytest.mark.parametrize('initial,params,expected_result,expected_exception',
@@ -30,3 +31,11 @@ def test_or_else():
     logger.addHandler(logging.StreamHandler(sio))
     assert try_(e_ / 0, 1).or_else(3, log=logger) == 3
     assert sio.getvalue().startswith('division by zero')
+
+
+def test_subclasses():
+    assert type(try_(e_ + 1, 1)) is Success
+    assert type(try_(e_ / 0, 1)) is Failure
+    assert Attempt(result=None) == Success(result=None)
+    assert type(Attempt(exception=ValueError())) is Failure
+    assert pickle.loads(pickle.dumps(try_(e_ + 1, 1))) == Attempt(result=2)
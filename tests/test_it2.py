@@ -5,6 +5,8 @@ import pytest
 from flo.it2 import from_, for_each, unique_index, index
 
 from flo.lamb import e_
+import flo.pipeline
+from flo.pipeline import ElementStep, pipeline
 
 
 def test_usage_examples() -> None:
@@ -67,7 +69,8 @@ def test_exclude(src, f, rep, expected):
 
 @pytest.mark.parametrize('src,f,expected',
                          [([3, 4], (set,), {3, 4}),
-                          ([3, 4], (list, str), '[3, 4]')
+                          ([3, 4], (list, str), '[3, 4]'),
+                          ([4, 3], (sorted, e_[0], str), '3')
                           ])
 def test_collect(src, f, expected):
     assert from_(src).collect(*f) == expected
@@ -88,10 +91,12 @@ def test_flatten(src: list, expected: list):
 
 def test_zip_with():
     assert for_each(1, 2, 3).zip_with('abc').to(list) == [(1, 'a'), (2, 'b'), (3, 'c')]
+    assert str(for_each(1, 2, 3).zip_with('abc')) == '(1, 2, 3) zip(str[3])'
 
 
 def test_chain():
     assert for_each(1, 2, 3).chain('abc').to(list) == [1, 2, 3, 'a', 'b', 'c']
+    assert str(for_each(1, 2, 3).chain(iter([4]))) == '(1, 2, 3) chain(list_iterator[?])'
 
 
 def test_dropwhile():
@@ -123,3 +128,90 @@ def test_index():
         pytest.fail('Expected exception')
     except KeyError as e:
         pass
+
+    # the very same object repeated is still a duplicate
+    with pytest.raises(KeyError):
+        from_(['a', 'a']).to(unique_index, key=e_)
+    assert from_(src).to(unique_index, key=lambda e, n: e[-n:], n=3) == {e[-3:]: e for e in src}
+
+
+def test_cache_partial_iteration():
+    calls = []
+    cached = from_(range(5)).map(lambda e: calls.append(e) or e).cache()
+    it = iter(cached)
+    assert next(it) == 0
+    assert cached.to(list) == [0, 1, 2, 3, 4]
+    it.close()
+    assert cached.to(list) == [0, 1, 2, 3, 4]
+    assert len(calls) == 6
+
+
+def test_cache_dtype():
+    np = pytest.importorskip('numpy')
+    calls = []
+    cached = from_(range(5)).map(lambda e: calls.append(e) or e * 0.5).cache('float64')
+    assert cached.to(list) == [0, 0.5, 1, 1.5, 2]
+    assert cached.to(sum) == 5
+    assert len(calls) == 5
+    assert isinstance(cached._src._cache, np.ndarray)
+
+
+def test_fused_map_filter():
+    it = from_(range(10)).map(e_ + 1).filter(lambda e: e % 2 == 0).map(str)
+    assert len(it._pipeline.compile()) == 1
+    assert len(it._pipeline.compile()[0].__defaults__) == 3
+    assert it._pipeline._compose() is it._pipeline.compile()[0]
+    assert it.to(list) == ['2', '4', '6', '8', '10']
+    assert from_(range(10)).filter(e_ > 7).to(list) == [8, 9]
+    assert from_(range(10)).exclude(e_ > 7).to(list) == list(range(8))
+    # a lone step runs through the builtin filter rather than a generated loop
+    assert isinstance(from_(range(10)).exclude(e_ > 7)._pipeline.compile()[0], ElementStep)
+    it = from_(range(10)).map(lambda e: e * 2).exclude(lambda e: e % 3 == 0).flatmap(lambda e: [e, -e]).exclude(e_ < -10)
+    assert len(it._pipeline.compile()) == 3
+    assert it.to(list) == [2, -2, 4, -4, 8, -8, 10, -10, 14, 16]
+    assert len(from_([1, 2]).map(e_ + 1).zip_with('ab')._pipeline.compile()) == 2
+
+
+def test_materialize():
+    p = pipeline().map(e_ + 1).filter(e_ > 3)
+    assert p.materialize(range(6), 'int64').tolist() == [4, 5, 6]
+    assert pipeline().map(len).materialize(['a', 'bc'], 'int32').tolist() == [1, 2]
+
+
+def test_kwargs():
+    def gt(e, than):
+        return e > than
+
+    assert from_(range(5)).filter(gt, than=2).to(list) == [3, 4]
+    assert from_(range(5)).exclude(gt, than=2).to(list) == [0, 1, 2]
+    assert from_(range(5)).dropwhile(gt, than=-1).to(list) == []
+    assert from_(range(5)).takewhile(gt, than=-1).to(list) == [0, 1, 2, 3, 4]
+    assert from_(range(3)).map(gt, than=0).to(list) == [False, True, True]
+    assert from_(range(3)).to(sorted, e_[0], reverse=True) == 2
+
+
+def test_builtin_collectors(monkeypatch):
+    it = from_(range(4)).map(lambda e: 1 // (e - 2))
+    assert it._pipeline.collect(list).raw
+    assert it._pipeline.collect(''.join).raw
+    assert not it._pipeline.collect(len).raw
+    assert from_('abc').map(str.upper).to(''.join) == 'ABC'
+    assert from_(range(4)).map(e_ + 1).to(sum) == 10
+    with pytest.raises(ZeroDivisionError, match='division'):
+        it.to(lambda e: list(e))
+    # when tracing, builtin collectors get the element it failed on too
+    monkeypatch.setattr(flo.pipeline, 'TRACE', True)
+    with pytest.raises(ZeroDivisionError, match='item 2'):
+        it.to(list)
+    with pytest.raises(ZeroDivisionError, match='item 2'):
+        it.to(lambda e: list(e))
+
+
+def test_no_labels(monkeypatch):
+    p = pipeline('src').map(e_ + 1).filter(e_ > 1)
+    assert p.label == 'src * _+1 / _>1'
+    assert str(p.collect(list)) == 'src * _+1 / _>1 > list'
+    monkeypatch.setattr(flo.pipeline, 'LABELS', False)
+    p = pipeline('src').map(e_ + 1).filter(e_ > 1)
+    assert p.label == 'src *  / '
+    assert p.collect(list)(range(3)) == [2, 3]
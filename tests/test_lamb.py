@@ -1,9 +1,12 @@
+import pickle
+import sys
+
 from flo import start as e_
 import pytest
 from operator import *
 
 from flo.attempt import Attempt
-from flo.lamb import interpret_between, UNASSIGNED, as_fcn
+from flo.lamb import interpret_between, UNASSIGNED, as_fcn, returns_bool, name_for
 
 
 def test_example_usage() -> None:
@@ -53,7 +56,10 @@ def test_method_args_kwargs() -> None:
                           (ge, 3, 3, True),
                           (add, 3, 1, 4),
                           (sub, 3, 1, 2),
-                          (truediv, 6, 3, 2)])
+                          (truediv, 6, 3, 2),
+                          (add, 'a', 'b', 'ab'),
+                          (lt, 'a', 'b', True),
+                          (mod, 7, 3, 1)])
 def test_binary_operators(operator, left, right, expected) -> None:
     assert operator(e_, right)(left) == expected
 
@@ -203,3 +209,60 @@ def test_not_none() -> None:
     assert e_.not_none()(None) == False
     assert e_.not_none()(32) == True
     assert e_.not_none()(0) == True
+
+
+def test_pickle() -> None:
+    f = e_.split(',')[1].upper()
+    g = pickle.loads(pickle.dumps(f))
+    assert g('a,b,c') == 'B'
+    assert str(g) == str(f)
+    assert pickle.loads(pickle.dumps(e_ < 3))(2)
+    assert pickle.loads(pickle.dumps(e_ - 3))(5) == 2
+
+
+def test_is_in_large_sequence() -> None:
+    big = list(range(100))
+    assert e_.is_in(big)(42)
+    assert e_.is_in(big)(420) == False
+    assert e_.not_in(big)(420)
+    # unhashable items or elements can't go through a set, so they're found by scanning the list
+    assert e_.is_in([[n] for n in range(10)]).invoke([3])
+    assert e_.not_in([[n] for n in range(10)]).invoke([11])
+    assert e_.is_in(big).invoke([42]) == False
+    assert e_.not_in(big).invoke([42])
+    assert str(e_.is_in([1, 2])) == '_ in [1, 2]'
+
+
+def test_is_in_returns_bool() -> None:
+    class Truthy:
+        def __contains__(self, item):
+            return 'yes' if item else ''
+
+    assert e_.is_in(Truthy()).invoke(1) is True
+    assert e_.is_in(Truthy()).invoke(0) is False
+    assert e_.is_in({1}).invoke(1) is True
+
+
+def test_returns_bool() -> None:
+    assert returns_bool(e_ > 3)
+    assert returns_bool(e_.has('a'))
+    assert returns_bool(e_.upper().startswith('a').truthy())
+    assert not returns_bool(e_ + 3)
+    assert not returns_bool(e_.upper())
+    assert not returns_bool(str)
+
+
+def test_no_reference_cycle() -> None:
+    # only the local and getrefcount's argument refer to it, so it's freed without waiting on the cyclic gc
+    lamb = e_.upper()
+    assert sys.getrefcount(lamb) == 2
+    assert lamb.f('a') == 'A'
+
+
+def test_lambda_name():
+    f = lambda e: e + 1
+    assert name_for(f) == "    f = lambda e: e + 1"
+    assert name_for(f) is name_for(f)
+    lamb = e_.a[3].upper()
+    assert name_for(lamb) == '_.a[3].upper()'
+    assert name_for(lamb) is name_for(lamb)
@@ -0,0 +1,62 @@
+import pytest
+
+import flo.pipeline
+from flo import _numba_backend
+from flo._numba_backend import MIN_SIZE, kernel_for
+from flo.it2 import from_
+from flo.lamb import e_
+from flo.pipeline import pipeline
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('numba')
+
+# each new kernel costs a compile of a second or more
+pytestmark = pytest.mark.slow
+
+
+def test_numba_kernel():
+    src = np.arange(MIN_SIZE, dtype='int64')
+    it = from_(src).map(e_ + 3).filter(e_ < 1000).map(e_ / 2)
+    assert it.to(list) == [(e + 3) / 2 for e in range(MIN_SIZE) if e + 3 < 1000]
+    assert from_(src).map(e_ - 1).to(sum) == sum(range(-1, MIN_SIZE - 1))
+    # strided views run through the same kernel as contiguous arrays
+    assert from_(np.arange(2 * MIN_SIZE)[::2]).map(e_ - 1).to(list)[:2] == [-1, 1]
+
+    kernel = pipeline().map(e_ + 1).filter(e_ > 3).to_numba('float64')
+    assert kernel(np.arange(6, dtype='float64')).tolist() == [4., 5., 6.]
+    assert pipeline().map(str).to_numba('float64') is None
+
+
+def test_kernel_collect():
+    # collectors see the same iterator whether or not the source is large enough for a kernel
+    for size in (10, MIN_SIZE):
+        it = from_(np.arange(size)).map(e_ + 1)
+        assert it.collect(next) == 1
+        assert it.collect(list) == list(range(1, size + 1))
+
+
+def test_kernel_constants():
+    src = np.arange(MIN_SIZE, dtype='int64')
+    assert from_(src).map(e_ + 3).filter(e_ < 10).to(list) == [3, 4, 5, 6, 7, 8, 9]
+    compiled = _numba_backend._compile.cache_info().currsize
+    # pipelines that differ only in their constants share a kernel
+    assert from_(src).map(e_ + 5).filter(e_ < 8).to(list) == [5, 6, 7]
+    assert _numba_backend._compile.cache_info().currsize == compiled
+
+    # constants that don't fit the dtype run through python, as they would for a small array
+    big = from_(src).map(e_ + 2 ** 70)
+    assert kernel_for(big._pipeline, src) is None
+    assert big.to(list)[:2] == [2 ** 70, 2 ** 70 + 1]
+    assert pipeline().map(e_ + 300).to_numba('int8') is None
+    assert pipeline().map(e_ + np.arange(3)).to_numba('int64') is None
+
+
+def test_kernel_trace(monkeypatch):
+    src = np.arange(MIN_SIZE, dtype='int64')
+    monkeypatch.setattr(flo.pipeline, 'TRACE', True)
+    assert kernel_for(pipeline().map(e_ + 3), src) is None
+
+
+def test_materialize_kernel():
+    p = pipeline().map(e_ + 1).filter(e_ > 3)
+    assert p.materialize(np.arange(6), 'float64').tolist() == [4., 5., 6.]
@@ -1,95 +1,266 @@
+import math
+import multiprocessing
+import os
+import sys
 import time
-from typing import Type, List, Any, Mapping, Tuple, Optional
+from threading import BrokenBarrierError
+from typing import Type, List, Any, Mapping, Tuple, Optional, Callable
 
 import pytest
 
 from flo.parallel import Threads, Processes, JobLibParallel
 from flo.lamb import star
-from flo.parallel import PFascade
+from flo.parallel import PFascade, FloFuture, pmap, tmap, SERIAL_THRESHOLD
 from flo.stopwatch import StopWatch
 
 SLEEP_SECS = 0.2
+MAP_SLEEP_SECS = 0.1  # the map tests need tasks of varying length, but not long ones
+BARRIER_SECS = 0.5
 NUM_WORKERS = 6
 NUM_TASKS = NUM_WORKERS * 3
+SEQUENTIAL_MAP_SECS = sum(MAP_SLEEP_SECS / (n + 1) for n in range(NUM_TASKS))
+# printing from every task contends for stdout, so only trace the tasks with FLO_TEST_VERBOSE=1
+VERBOSE = bool(os.environ.get('FLO_TEST_VERBOSE'))
 
 
 def for_each_impl(*args) -> List[Any]:
-    return [(impl, *args) for impl in (Threads, Processes, JobLibParallel)]
+    # joblib's scheduling overhead swamps these tiny tasks, so it's covered by test_joblib_smoke instead
+    return [(impl, *args) for impl in (Threads, Processes)]
+
+
+@pytest.fixture(scope='session')
+def pool() -> Callable[[Type[PFascade], int], PFascade]:
+    """Returns a function giving an entered pool of the given type and size, shared across tests.
+    Each pool has already started all its workers, so tests can time it without warming it up first."""
+    pools = {}
+
+    def get(concrete_impl: Type[PFascade], max_workers: int) -> PFascade:
+        pf = pools.get((concrete_impl, max_workers))
+        if pf is None:
+            pf = concrete_impl(max_workers=max_workers).__enter__()
+            for f in [pf.submit(time.sleep, SLEEP_SECS / 10) for _ in range(max_workers)]:
+                f.result()
+            pools[(concrete_impl, max_workers)] = pf
+        return pf
+
+    yield get
+    for pf in pools.values():
+        pf.__exit__(None, None, None)
+
+
+def small_batch(concrete_impl: Type[PFascade]) -> int:
+    """Batches of one task are cheap for threads, but across processes hardly anything but pickling gets done"""
+    return 1 if issubclass(concrete_impl, Threads) else max(NUM_TASKS // NUM_WORKERS, 2)
 
 
 def sleepy(duration, *args, **kwargs) -> Tuple[Tuple[Any, ...], Mapping[str, Any]]:
-    import os
-    import threading
-    print('sleeping for', duration, 'pid', os.getpid(), 'thread', threading.current_thread())
+    if VERBOSE:
+        import threading
+        print('sleeping for', duration, 'pid', os.getpid(), 'thread', threading.current_thread())
     time.sleep(duration)
-    print('done sleeping for', duration, 'pid', os.getpid(), 'thread', threading.current_thread())
+    if VERBOSE:
+        print('done sleeping for', duration, 'pid', os.getpid(), 'thread', threading.current_thread())
     return args, kwargs
 
 
+@pytest.fixture(scope='session')
+def manager():
+    with multiprocessing.Manager() as m:
+        yield m
+
+
+def meet(barrier, *args, **kwargs) -> Tuple[Tuple[Any, ...], Mapping[str, Any]]:
+    """Waits for as many tasks as barrier has parties to be running at once"""
+    barrier.wait(timeout=BARRIER_SECS)
+    return args, kwargs
+
+
+def cpu_heavy(n: int) -> float:
+    return sum(math.sin(i) * math.cos(i) for i in range(n))
+
+
+def fail_after(duration):
+    time.sleep(duration)
+    raise ValueError(f"failed after {duration}s")
+
+
 @pytest.mark.parametrize('concrete_impl,task,args,kwargs',
-                         for_each_impl(sleepy, (1,), dict(foo='you')))
-def test_submit(concrete_impl: Type[PFascade], task, args, kwargs):
-    print('1 worker submit', concrete_impl, task, args, kwargs)
-    with concrete_impl(max_workers=1) as pf:
-        with StopWatch() as sw:
-            futures = [pf.submit(task, SLEEP_SECS, args[0] + n, **kwargs) for n in range(NUM_TASKS)]
-            results = [f.result() for f in futures]
-    assert sw.duration() > NUM_TASKS * SLEEP_SECS
+                         for_each_impl(meet, (1,), dict(foo='you')))
+def test_submit(pool, manager, concrete_impl: Type[PFascade], task, args, kwargs):
+    # a single worker never runs two tasks at once, so they can't meet
+    pf = pool(concrete_impl, 1)
+    barrier = manager.Barrier(2)
+    futures = [pf.submit(task, barrier, args[0] + n, **kwargs) for n in range(2)]
+    with pytest.raises(BrokenBarrierError):
+        [f.result() for f in futures]
+
+    # whereas a full pool runs NUM_WORKERS at a time, so they meet in groups of NUM_WORKERS
+    pf = pool(concrete_impl, NUM_WORKERS)
+    barrier = manager.Barrier(NUM_WORKERS)
+    futures = [pf.submit(task, barrier, args[0] + n, **kwargs) for n in range(NUM_TASKS)]
+    results = [f.result() for f in futures]
     assert results == [((args[0] + n,), kwargs) for n in range(NUM_TASKS)]
 
-    print(NUM_WORKERS, 'worker submit', concrete_impl, task, args, kwargs)
 
-    with concrete_impl(max_workers=NUM_WORKERS) as pf:
-        for n in range(2):  # need to warm up pool first
-            with StopWatch() as sw:
-                futures = [pf.submit(task, SLEEP_SECS, args[0] + n, **kwargs) for n in range(NUM_TASKS)]
-                results = [f.result() for f in futures]
-    max_duration = 1.2 * NUM_TASKS * SLEEP_SECS / NUM_WORKERS
-    assert sw.duration() < max_duration
+@pytest.mark.parametrize('concrete_impl,task,args,kwargs',
+                         for_each_impl(sleepy, (1,), dict(foo='you')))
+def test_map_ordered(pool, concrete_impl: Type[PFascade], task, args, kwargs):
+    items = [(MAP_SLEEP_SECS / (n + 1), args[0] + n) for n in range(NUM_TASKS)]
+    pf = pool(concrete_impl, 1)
+    with StopWatch(verbose=VERBOSE) as sw:
+        results = pf.map_ordered(star(sleepy), items, **kwargs)
+    assert sw.duration() > SEQUENTIAL_MAP_SECS
     assert results == [((args[0] + n,), kwargs) for n in range(NUM_TASKS)]
 
 
 @pytest.mark.parametrize('concrete_impl,task,args,kwargs',
                          for_each_impl(sleepy, (1,), dict(foo='you')))
-def test_map_ordered(concrete_impl: Type[PFascade], task, args, kwargs):
-    items = [(SLEEP_SECS / (n + 1), args[0] + n) for n in range(NUM_TASKS)]
-    sequential_duration = sum(SLEEP_SECS / (n + 1) for n in range(NUM_TASKS))
-    print(1, 'worker map_ordered', concrete_impl, task, args, kwargs)
-    with concrete_impl(max_workers=1) as pf:
-        with StopWatch() as sw:
-            results = pf.map_ordered(star(sleepy), items, **kwargs)
-    assert sw.duration() > sequential_duration
+def test_map_ordered_parallel(pool, concrete_impl: Type[PFascade], task, args, kwargs):
+    items = [(MAP_SLEEP_SECS / (n + 1), args[0] + n) for n in range(NUM_TASKS)]
+    pf = pool(concrete_impl, NUM_WORKERS)
+    results = pf.map_ordered(star(sleepy), items, **kwargs)
     assert results == [((args[0] + n,), kwargs) for n in range(NUM_TASKS)]
 
-    print(NUM_WORKERS, 'worker map_ordered', concrete_impl, task, args, kwargs)
-    with concrete_impl(max_workers=NUM_WORKERS) as pf:
-        with StopWatch() as sw:
-            results = pf.map_ordered(star(sleepy), items, **kwargs)
-    max_duration = 1.1 * NUM_TASKS * sequential_duration / NUM_WORKERS
-    assert sw.duration() < max_duration
-    assert results == [((args[0] + n,), kwargs) for n in range(NUM_TASKS)]
+
+UNORDERED_CASES = [*for_each_impl(None, sleepy, (1,), dict(foo='you')),
+                   *[(impl, small_batch(impl), *rest) for impl, *rest in for_each_impl(sleepy, (1,), dict(foo='you'))],
+                   *for_each_impl(2, sleepy, (1,), dict(foo='you'))]
 
 
-@pytest.mark.parametrize('concrete_impl,batch_size,task,args,kwargs',
-                         [*for_each_impl(None, sleepy, (1,), dict(foo='you')),
-                          *for_each_impl(1, sleepy, (1,), dict(foo='you')),
-                          *for_each_impl(2, sleepy, (1,), dict(foo='you'))
-                          ])
-def test_map_unordered(concrete_impl: Type[PFascade], batch_size: Optional[int], task, args, kwargs):
-    items = [(SLEEP_SECS / (n + 1), args[0] + n) for n in range(NUM_TASKS)]
-    sequential_duration = sum(SLEEP_SECS / (n + 1) for n in range(NUM_TASKS))
-    print(1, 'worker map_unordered', concrete_impl, task, args, kwargs)
-    with concrete_impl(max_workers=1) as pf:
-        with StopWatch() as sw:
-            results = list(pf.map_unordered(star(sleepy), items, batch_size=batch_size, **kwargs))
+@pytest.mark.parametrize('concrete_impl,batch_size,task,args,kwargs', UNORDERED_CASES)
+def test_map_unordered(pool, concrete_impl: Type[PFascade], batch_size: Optional[int], task, args, kwargs):
+    items = [(MAP_SLEEP_SECS / (n + 1), args[0] + n) for n in range(NUM_TASKS)]
+    pf = pool(concrete_impl, 1)
+    with StopWatch(verbose=VERBOSE) as sw:
+        results = list(pf.map_unordered(star(sleepy), items, batch_size=batch_size, **kwargs))
     assert results == [((args[0] + n,), kwargs) for n in range(NUM_TASKS)]
-    assert sw.duration() > sequential_duration
-
-    print(NUM_WORKERS, 'worker map_unordered', concrete_impl, task, args, kwargs)
-    with concrete_impl(max_workers=NUM_WORKERS) as pf:
-        with StopWatch() as sw:
-            results = list(pf.map_unordered(star(sleepy), items, batch_size=batch_size, **kwargs))
-    if batch_size is None:
-        assert sw.duration() < 1.1 * NUM_TASKS * sequential_duration / NUM_WORKERS
+    assert sw.duration() > SEQUENTIAL_MAP_SECS
+
+
+@pytest.mark.parametrize('concrete_impl,batch_size,task,args,kwargs', UNORDERED_CASES)
+def test_map_unordered_parallel(pool, concrete_impl: Type[PFascade], batch_size: Optional[int], task, args, kwargs):
+    items = [(MAP_SLEEP_SECS / (n + 1), args[0] + n) for n in range(NUM_TASKS)]
+    pf = pool(concrete_impl, NUM_WORKERS)
+    results = list(pf.map_unordered(star(sleepy), items, batch_size=batch_size, **kwargs))
     assert set((a, tuple(k.items())) for a, k in results) == \
            {((args[0] + n,), tuple(kwargs.items())) for n in range(NUM_TASKS)}
+
+
+def test_map_unordered_tiny_batch(pool):
+    # process pools still need to handle batches of one, just not with a full NUM_TASKS of them
+    items = [(0, n) for n in range(6)]
+    results = pool(Processes, NUM_WORKERS).map_unordered(star(sleepy), items, batch_size=1)
+    assert sorted(a for a, _ in results) == [(n,) for n in range(6)]
+
+
+@pytest.mark.parametrize('concrete_impl', [Threads, Processes])
+def test_map_unordered_scalability(pool, manager, concrete_impl: Type[PFascade]):
+    # collecting each result as it finishes must stay linear in the number of tasks, rather than rescanning
+    # the pending futures after each one, so the pool stays saturated however many tasks there are:
+    # every NUM_WORKERS of them have to be running at once to meet
+    n = NUM_WORKERS * 34
+    barrier = manager.Barrier(NUM_WORKERS)
+    pf = pool(concrete_impl, NUM_WORKERS)
+    results = list(pf.map_unordered(meet, [barrier] * n))
+    assert len(results) == n
+
+
+@pytest.mark.slow
+def test_joblib_smoke(pool):
+    pf = pool(JobLibParallel, 2)
+    assert pf.submit(sleepy, 0, 1, foo='you').result() == ((1,), dict(foo='you'))
+    items = [(MAP_SLEEP_SECS, n) for n in range(4)]
+    assert pf.map_ordered(star(sleepy), items, foo='you') == [((n,), dict(foo='you')) for n in range(4)]
+    assert sorted(a for a, _ in pf.map_unordered(star(sleepy), items)) == [(n,) for n in range(4)]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('concrete_impl', [Threads, Processes])
+def test_cpu_heavy(pool, concrete_impl: Type[PFascade]):
+    # sleepy releases the GIL, so only a task running python code shows whether threads really run in parallel
+    if concrete_impl is Threads and getattr(sys, '_is_gil_enabled', lambda: True)():
+        pytest.skip('threads only run python code in parallel on free-threaded python')
+    items = [100_000] * 4
+    with StopWatch(verbose=False) as serial:
+        expected = [cpu_heavy(n) for n in items]
+    pf = pool(concrete_impl, 2)
+    with StopWatch(verbose=False) as sw:
+        assert pf.map_ordered(cpu_heavy, items) == expected
+    if (os.cpu_count() or 1) >= 2:
+        # two workers would ideally halve the time, but loaded machines are far from ideal
+        assert sw.duration() < serial.duration()
+
+
+@pytest.mark.parametrize('n', [3, SERIAL_THRESHOLD, 5 * SERIAL_THRESHOLD])
+def test_pmap(n):
+    items = list(range(n))
+    assert pmap(pow, items, exp=2) == [e ** 2 for e in items]
+    assert tmap(pow, items, exp=2) == [e ** 2 for e in items]
+    assert pmap(pow, iter(items), exp=2) == [e ** 2 for e in items]
+
+
+def test_map_unordered_timeout():
+    with Threads(max_workers=1) as pf:
+        with pytest.raises(TimeoutError):
+            list(pf.map_unordered(sleepy, [SLEEP_SECS], timeout=SLEEP_SECS / 10))
+
+
+@pytest.mark.parametrize('concrete_impl', [Threads, Processes])
+def test_map_ordered_chunks(pool, concrete_impl: Type[PFascade]):
+    # chunks, including a short last one, come back in the order of it
+    assert pool(concrete_impl, 2).map_ordered(str, range(10), chunksize=3) == [str(n) for n in range(10)]
+
+
+def test_map_ordered_timeout():
+    # the timeout is per element, so a long run of quick tasks doesn't hit it
+    with Threads(max_workers=1) as pf:
+        items = [(SLEEP_SECS / 10, n) for n in range(10)]
+        assert len(pf.map_ordered(star(sleepy), items, timeout=SLEEP_SECS / 2)) == 10
+        with pytest.raises(TimeoutError):
+            pf.map_ordered(sleepy, [SLEEP_SECS], timeout=SLEEP_SECS / 10)
+
+
+@pytest.mark.parametrize('concrete_impl', [Threads, Processes])
+def test_submit_future_args(concrete_impl: Type[PFascade]):
+    with concrete_impl(max_workers=2) as pf:
+        first = pf.submit(sleepy, SLEEP_SECS, 1)
+        second = pf.submit(sleepy, 0, first, foo=first)
+        # submitting second shouldn't wait on first
+        assert not first.done()
+        assert second.result() == ((((1,), {}),), dict(foo=((1,), {})))
+        failed = pf.submit(sleepy, 0, pf.submit(fail_after, SLEEP_SECS))
+        with pytest.raises(ValueError):
+            failed.result()
+
+
+def test_flo_future(pool):
+    f = FloFuture()
+    done = []
+    f.add_done_callback(done.append)
+    with pytest.raises(TimeoutError):
+        f.result(timeout=0.01)
+    pool(Threads, 1).submit(time.sleep, SLEEP_SECS).add_done_callback(lambda _: f.set_result(3))
+    assert f.result() == 3
+    assert done == [f]
+    assert not f.cancel()
+
+
+def shared_info(a) -> Tuple[float, bool]:
+    return float(a.sum()), a.flags.writeable
+
+
+def lookup(i: int, table) -> float:
+    return float(table[i])
+
+
+def test_processes_broadcast():
+    np = pytest.importorskip('numpy')
+    table = np.arange(100_000, dtype=float)
+    with Processes(max_workers=2) as pf:
+        b = pf.broadcast(table=table, blob=b'hello')
+        assert b['table'].result() is table
+        assert [f.result() for f in [pf.submit(shared_info, b['table']) for _ in range(4)]] == [(table.sum(), False)] * 4
+        assert pf.submit(len, b['blob']).result() == 5
+        assert pf.map_ordered(lookup, [0, 5], table=b['table']) == [0.0, 5.0]
+        with pytest.warns(UserWarning):
+            assert pf.broadcast(other=3)['other'].result() == 3
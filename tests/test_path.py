@@ -0,0 +1,88 @@
+import os
+import threading
+from hashlib import md5
+from pathlib import Path
+
+import pytest
+
+from flo import e_
+from flo.path import path_for, FloPath, read_ahead, content_md5, ls
+
+TEST_FILE = Path(__file__).parent / 'rand16k.file'
+
+
+def test_copy_to(tmp_path):
+    dest = tmp_path / 'copy.file'
+    assert path_for(TEST_FILE).copy_to(dest) == TEST_FILE.stat().st_size
+    assert dest.read_bytes() == TEST_FILE.read_bytes()
+
+    # the generic, streaming implementation
+    dest = tmp_path / 'streamed.file'
+    assert FloPath.copy_to(path_for(TEST_FILE), dest) == TEST_FILE.stat().st_size
+    assert dest.read_bytes() == TEST_FILE.read_bytes()
+
+
+def test_from_lines(tmp_path):
+    lines = [f"line {n}\n" for n in range(1000)]
+    src = tmp_path / 'lines.txt'
+    src.write_text(''.join(lines))
+    assert path_for(src).from_lines().to(list) == lines
+
+    # should match text mode's newline translation
+    for data in [b'', b'a\nb', b'a\r\nb\rc\n\xc3\xa9\n', b'\r\r\n\n', b'x\r']:
+        src.write_bytes(data)
+        with src.open('rt', encoding='utf-8') as f:
+            assert path_for(src).from_lines().to(list) == list(f)
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='needs named pipes')
+def test_from_lines_fifo(tmp_path):
+    # a fifo can only be read once, so from_lines mustn't open it to check whether it's mappable
+    src = tmp_path / 'lines.fifo'
+    os.mkfifo(src)
+    lines = [f"line {n}\n" for n in range(1000)]
+    writer = threading.Thread(target=src.write_text, args=(''.join(lines),))
+    writer.start()
+    assert path_for(src).from_lines().to(list) == lines
+    writer.join()
+
+
+def test_read_ahead():
+    with TEST_FILE.open('rb') as f:
+        assert b''.join(read_ahead(f, chunk_size=1000)) == TEST_FILE.read_bytes()
+    # stopping early shouldn't leave the reader stuck
+    with TEST_FILE.open('rb') as f:
+        assert next(iter(read_ahead(f, chunk_size=10, depth=1))) == TEST_FILE.read_bytes()[:10]
+
+
+def test_content_md5():
+    expected = md5(TEST_FILE.read_bytes()).hexdigest()
+    assert content_md5(TEST_FILE) == expected
+    assert FloPath.content_md5(path_for(TEST_FILE)) == expected
+
+
+@pytest.mark.parametrize('recursive', [False, True])
+def test_ls(tmp_path, capsys, recursive):
+    (tmp_path / 'a.txt').write_text('hello')
+    (tmp_path / '.hidden').write_text('')
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'b.txt').write_text('')
+    contents = ls(tmp_path, recursive=recursive, print_hidden=False, sort_key=e_.path.name)
+    expected = ['a.txt', 'b.txt', 'sub'] if recursive else ['a.txt', 'sub']
+    assert [p.path.name for p in contents] == expected
+    out = capsys.readouterr().out
+    assert '5 B' in out and '----' in out and '.hidden' not in out
+    assert [p.path.name for p in ls(tmp_path, glob='*.txt')] == ['a.txt']
+
+
+def test_cached_stat(tmp_path):
+    f = tmp_path / 'f.txt'
+    f.write_text('hi')
+    p = path_for(f)
+    assert p.size() == 2
+    f.write_text('hello')
+    assert p.size() == 2  # stat is cached for the life of p
+    assert p.refresh().size() == 5
+    with p.open('wt') as out:
+        out.write('hello world')
+    assert p.size() == 11
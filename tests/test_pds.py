@@ -1,105 +1,155 @@
+from functools import partial
+from typing import Callable
+
+import numpy as np
 import pandas as pd
 import pytest
 from pandas.testing import assert_series_equal, assert_frame_equal
 
 from flo import e_
+from flo.lamb import vectorized, vectorizes
 from flo.pds import monkey_patch_pandas
 
 monkey_patch_pandas()
 
 
+# the series most cases start from; they're built per test by calling these
+_S = partial(pd.Series, [1, 2, 3, 4, 3])
+_SN = partial(pd.Series, [1, 2, 3, float('nan'), 3])
+_SS = partial(pd.Series, ["foo", "bar", None, "baz"])
+
+
+def foo_frame(series: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame(dict(foo=series))
+
+
+def assert_eq(actual, expected) -> None:
+    """A much cheaper check than pandas' assert_series_equal/assert_frame_equal for the tiny pandas objects here:
+    same type, dtype(s), names, index labels and values, with missing values matching each other"""
+    assert type(actual) is type(expected)
+    if isinstance(actual, pd.DataFrame):
+        assert actual.columns.tolist() == expected.columns.tolist()
+        for column in actual:
+            assert_eq(actual[column], expected[column])
+        return
+    assert actual.dtype == expected.dtype
+    assert actual.name == expected.name
+    assert actual.index.name == expected.index.name
+    assert actual.index.tolist() == expected.index.tolist()
+    a, e = actual.to_numpy(), expected.to_numpy()
+    missing = pd.isna(a)
+    assert (missing == pd.isna(e)).all()
+    assert (a[~missing] == e[~missing]).all()
+
+
 @pytest.mark.parametrize('series,value,expected',
-                         [(pd.Series([1, 2, 3, 4, 3]), 3, pd.Series([3, 3], index=[2, 4])),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), 3, pd.Series([3, 3], index=[2, 4], dtype=float)),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), None, pd.Series([float('nan')], index=[3])),
-                          (pd.Series(["foo", "bar", None, "baz"]), "bar", pd.Series(["bar"], index=[1])),
-                          (pd.Series(["foo", "bar", None, "baz"]), None, pd.Series([None], index=[2])),
-                          (pd.Series(["foo"]), "you", pd.Series([], dtype=object))
+                         [(_S, 3, partial(pd.Series, [3, 3], index=[2, 4])),
+                          (_SN, 3, partial(pd.Series, [3, 3], index=[2, 4], dtype=float)),
+                          (_SN, None, partial(pd.Series, [float('nan')], index=[3])),
+                          (_SS, "bar", partial(pd.Series, ["bar"], index=[1])),
+                          (_SS, None, partial(pd.Series, [None], index=[2])),
+                          (partial(pd.Series, ["foo"]), "you", partial(pd.Series, [], dtype=object))
                           ])
-def test_only(series: pd.Series, value, expected: pd.Series):
-    assert_series_equal(series.only(value), expected)
-    assert_frame_equal(pd.DataFrame(dict(foo=series)).only(foo=value), pd.DataFrame(dict(foo=expected)))
+def test_only(series: Callable[[], pd.Series], value, expected: Callable[[], pd.Series]):
+    series, expected = series(), expected()
+    assert_eq(series.only(value), expected)
+    assert_eq(foo_frame(series).only(foo=value), foo_frame(expected))
 
 
 @pytest.mark.parametrize('series,value,expected',
-                         [(pd.Series([1, 2, 3, 4, 3]), 3, pd.Series([1, 2, 4], index=[0, 1, 3])),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), 3,
-                           pd.Series([1, 2, float('nan')], index=[0, 1, 3], dtype=float)),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), None,
-                           pd.Series([1, 2, 3, 3], index=[0, 1, 2, 4], dtype=float)),
-                          (pd.Series(["foo", "bar", None, "baz"]), "bar",
-                           pd.Series(["foo", None, "baz"], index=[0, 2, 3])),
-                          (pd.Series(["foo", "bar", None, "baz"]), None,
-                           pd.Series(["foo", "bar", "baz"], index=[0, 1, 3])),
-                          (pd.Series(["foo"]), "you", pd.Series(["foo"]))
+                         [(_S, 3, partial(pd.Series, [1, 2, 4], index=[0, 1, 3])),
+                          (_SN, 3,
+                           partial(pd.Series, [1, 2, float('nan')], index=[0, 1, 3], dtype=float)),
+                          (_SN, None,
+                           partial(pd.Series, [1, 2, 3, 3], index=[0, 1, 2, 4], dtype=float)),
+                          (_SS, "bar",
+                           partial(pd.Series, ["foo", None, "baz"], index=[0, 2, 3])),
+                          (_SS, None,
+                           partial(pd.Series, ["foo", "bar", "baz"], index=[0, 1, 3])),
+                          (partial(pd.Series, ["foo"]), "you", partial(pd.Series, ["foo"]))
                           ])
-def test_ds_without(series: pd.Series, value, expected: pd.Series):
-    assert_series_equal(series.without(value), expected)
-    assert_frame_equal(pd.DataFrame(dict(foo=series)).without(foo=value), pd.DataFrame(dict(foo=expected)))
+def test_ds_without(series: Callable[[], pd.Series], value, expected: Callable[[], pd.Series]):
+    series, expected = series(), expected()
+    assert_eq(series.without(value), expected)
+    assert_eq(foo_frame(series).without(foo=value), foo_frame(expected))
 
 
 @pytest.mark.parametrize('series,condition,expected',
-                         [(pd.Series([1, 2, 3, 4, 3]), lambda e: e % 2 == 0, pd.Series([2, 4], index=[1, 3])),
-                          (pd.Series(["foo", "bar", "baz"]), e_.startswith('b'),
-                           pd.Series(["bar", "baz"], index=[1, 2]))
+                         [(_S, lambda e: e % 2 == 0, partial(pd.Series, [2, 4], index=[1, 3])),
+                          (_S, vectorized(lambda s: s % 2 == 0), partial(pd.Series, [2, 4], index=[1, 3])),
+                          (partial(pd.Series, ["foo", "bar", "baz"]), e_.startswith('b'),
+                           partial(pd.Series, ["bar", "baz"], index=[1, 2])),
+                          (_S, e_ > 2, partial(pd.Series, [3, 4, 3], index=[2, 3, 4])),
+                          (partial(pd.Series, [1.0, float('nan'), 3.0]), np.isnan, partial(pd.Series, [float('nan')], index=[1])),
                           ])
-def test_ds_only_if(series: pd.Series, condition, expected: pd.Series):
-    assert_series_equal(series.only_if(condition), expected)
-    assert_frame_equal(pd.DataFrame(dict(foo=series)).only_if(foo=condition), pd.DataFrame(dict(foo=expected)))
+def test_ds_only_if(series: Callable[[], pd.Series], condition, expected: Callable[[], pd.Series]):
+    series, expected = series(), expected()
+    assert_eq(series.only_if(condition), expected)
+    assert_eq(foo_frame(series).only_if(foo=condition), foo_frame(expected))
 
 
 @pytest.mark.parametrize('series,value,expected',
-                         [(pd.Series([1, 2, 3, 4, 3]), {3}, pd.Series([3, 3], index=[2, 4])),
-                          (pd.Series([1, 2, 3, 4, 3]), {7, 3, 18}, pd.Series([3, 3], index=[2, 4])),
-                          (pd.Series([1, 2, 3, 4, 3]), {3, 4}, pd.Series([3, 4, 3], index=[2, 3, 4])),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), {3}, pd.Series([3, 3], index=[2, 4], dtype=float)),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), {float('nan')}, pd.Series([float('nan')], index=[3])),
-                          (pd.Series(["foo", "bar", None, "baz"]), {"bar"}, pd.Series(["bar"], index=[1])),
-                          (pd.Series(["foo", "bar", None, "baz"]), {None}, pd.Series([None], index=[2])),
-                          (pd.Series(["foo"]), {"you"}, pd.Series([], dtype=object)),
-                          (pd.Series(["foo"]), set(), pd.Series([], dtype=object))
+                         [(_S, {3}, partial(pd.Series, [3, 3], index=[2, 4])),
+                          (_S, {7, 3, 18}, partial(pd.Series, [3, 3], index=[2, 4])),
+                          (_S, {3, 4}, partial(pd.Series, [3, 4, 3], index=[2, 3, 4])),
+                          (_SN, {3}, partial(pd.Series, [3, 3], index=[2, 4], dtype=float)),
+                          (_SN, {float('nan')}, partial(pd.Series, [float('nan')], index=[3])),
+                          (_SS, {"bar"}, partial(pd.Series, ["bar"], index=[1])),
+                          (_SS, {None}, partial(pd.Series, [None], index=[2])),
+                          (partial(pd.Series, ["foo"]), {"you"}, partial(pd.Series, [], dtype=object)),
+                          (partial(pd.Series, ["foo"]), set(), partial(pd.Series, [], dtype=object))
                           ])
-def test_ds_only_in(series: pd.Series, value, expected: pd.Series):
-    assert_series_equal(series.only_in(value), expected)
-    assert_frame_equal(pd.DataFrame(dict(foo=series)).only_in(foo=value), pd.DataFrame(dict(foo=expected)))
+def test_ds_only_in(series: Callable[[], pd.Series], value, expected: Callable[[], pd.Series]):
+    series, expected = series(), expected()
+    assert_eq(series.only_in(value), expected)
+    assert_eq(foo_frame(series).only_in(foo=value), foo_frame(expected))
 
 
 @pytest.mark.parametrize('series,value,expected',
-                         [(pd.Series([1, 2, 3, 4, 3]), {3}, pd.Series([1, 2, 4], index=[0, 1, 3])),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), {3},
-                           pd.Series([1, 2, float('nan')], index=[0, 1, 3], dtype=float)),
-                          (pd.Series([1, 2, 3, float('nan'), 3]), {float('nan')},
-                           pd.Series([1, 2, 3, 3], index=[0, 1, 2, 4], dtype=float)),
-                          (pd.Series(["foo", "bar", None, "baz"]), {"bar"},
-                           pd.Series(["foo", None, "baz"], index=[0, 2, 3])),
-                          (pd.Series(["foo", "bar", None, "baz"]), {None},
-                           pd.Series(["foo", "bar", "baz"], index=[0, 1, 3])),
-                          (pd.Series(["foo"]), {"you"}, pd.Series(["foo"]))
+                         [(_S, {3}, partial(pd.Series, [1, 2, 4], index=[0, 1, 3])),
+                          (_SN, {3},
+                           partial(pd.Series, [1, 2, float('nan')], index=[0, 1, 3], dtype=float)),
+                          (_SN, {float('nan')},
+                           partial(pd.Series, [1, 2, 3, 3], index=[0, 1, 2, 4], dtype=float)),
+                          (_SS, {"bar"},
+                           partial(pd.Series, ["foo", None, "baz"], index=[0, 2, 3])),
+                          (_SS, {None},
+                           partial(pd.Series, ["foo", "bar", "baz"], index=[0, 1, 3])),
+                          (partial(pd.Series, ["foo"]), {"you"}, partial(pd.Series, ["foo"]))
                           ])
-def test_ds_not_in(series: pd.Series, value, expected: pd.Series):
-    assert_series_equal(series.not_in(value), expected)
-    assert_frame_equal(pd.DataFrame(dict(foo=series)).not_in(foo=value), pd.DataFrame(dict(foo=expected)))
+def test_ds_not_in(series: Callable[[], pd.Series], value, expected: Callable[[], pd.Series]):
+    series, expected = series(), expected()
+    assert_eq(series.not_in(value), expected)
+    assert_eq(foo_frame(series).not_in(foo=value), foo_frame(expected))
 
 
 @pytest.mark.parametrize('series,method,value,expected',
-                         [(pd.Series([1, 2, 3, 4, 3]), "gt_", 3, pd.Series([4], index=[3])),
-                          (pd.Series([1, 2, 3, 4, 3]), "geq_", 3, pd.Series([3, 4, 3], index=[2, 3, 4])),
-                          (pd.Series([1, 2, 3, 4, 3]), "lt_", 3, pd.Series([1, 2], index=[0, 1])),
-                          (pd.Series([1, 2, 3, 4, 3]), "leq_", 3,
-                           pd.Series([1, 2, 3, 3], index=[0, 1, 2, 4])),
+                         [(_S, "gt_", 3, partial(pd.Series, [4], index=[3])),
+                          (_S, "geq_", 3, partial(pd.Series, [3, 4, 3], index=[2, 3, 4])),
+                          (_S, "lt_", 3, partial(pd.Series, [1, 2], index=[0, 1])),
+                          (_S, "leq_", 3,
+                           partial(pd.Series, [1, 2, 3, 3], index=[0, 1, 2, 4])),
                           ])
-def test_ds_ops(series: pd.Series, method: str, value, expected: pd.Series):
-    assert_series_equal(getattr(pd.Series, method)(series, value), expected)
-    assert_frame_equal(getattr(pd.DataFrame, method)(pd.DataFrame(dict(foo=series)), foo=value), pd.DataFrame(dict(foo=expected)))
+def test_ds_ops(series: Callable[[], pd.Series], method: str, value, expected: Callable[[], pd.Series]):
+    series, expected = series(), expected()
+    assert_eq(getattr(pd.Series, method)(series, value), expected)
+    assert_eq(getattr(pd.DataFrame, method)(foo_frame(series), foo=value), foo_frame(expected))
 
 
 @pytest.mark.parametrize('series,kwargs,expected',
-                         [(pd.Series([1, 2, 3, 4, 3]), {}, pd.Series([2, 1, 1, 1], index=[3, 1, 2, 4])),
+                         [(_S, {}, partial(pd.Series, [2, 1, 1, 1], index=[3, 1, 2, 4])),
                           ])
-def test_ds_ops(series: pd.Series, kwargs, expected: pd.Series):
-    assert_series_equal(series.count_distinct(**kwargs), expected)
-    expected.index.rename('foo', inplace=True)
-    assert_series_equal(pd.DataFrame(dict(foo=series)).count_by('foo', **kwargs), expected)
+def test_ds_count_distinct(series: Callable[[], pd.Series], kwargs, expected: Callable[[], pd.Series]):
+    series, expected = series(), expected()
+    assert_eq(series.count_distinct(**kwargs), expected)
+    assert_eq(foo_frame(series).count_by('foo', **kwargs), expected.rename_axis('foo'))
+
+
+# the ways of writing an interval for DataFrame.only_between, by (left_inclusive, right_inclusive)
+_INTERVALS = {(True, True): lambda left, right: [left, right],
+              (True, False): lambda left, right: f"[{left},{right})",
+              (False, True): lambda left, right: f"({left},{right}]",
+              (False, False): lambda left, right: (left, right)}
 
 
 @pytest.mark.parametrize('left,right,left_inclusive,right_inclusive,element,expected',
@@ -110,15 +160,59 @@ def test_ds_ops(series: pd.Series, kwargs, expected: pd.Series):
                           (2, 10, False, False, 2, [])
                           ])
 def test_between(left, right, left_inclusive, right_inclusive, element, expected) -> None:
-    assert_series_equal(pd.Series([element]).only_between(left, right, left_inclusive=left_inclusive, right_inclusive=right_inclusive), pd.Series(expected, dtype='int64'))
-    if left_inclusive:
-        if right_inclusive:
-            interval = [left, right]
-        else:
-            interval = f"[{left},{right})"
-    else:
-        if right_inclusive:
-            interval = f"({left},{right}]"
-        else:
-            interval = (left, right)
-    assert_frame_equal(pd.DataFrame(dict(foo=[element])).only_between(foo=interval), pd.DataFrame(dict(foo=expected), dtype='int64'))
+    assert_eq(pd.Series([element]).only_between(left, right, left_inclusive=left_inclusive, right_inclusive=right_inclusive), pd.Series(expected, dtype='int64'))
+    interval = _INTERVALS[(left_inclusive, right_inclusive)](left, right)
+    assert_eq(pd.DataFrame(dict(foo=[element])).only_between(foo=interval), pd.DataFrame(dict(foo=expected), dtype='int64'))
+
+
+def test_only_if_vectorized(monkeypatch):
+    def no_apply(*args, **kwargs):
+        raise AssertionError('should have been applied to the whole series')
+
+    monkeypatch.setattr(pd.Series, 'apply', no_apply)
+    assert _S().only_if(vectorized(lambda s: s % 2 == 0)).tolist() == [2, 4]
+
+    class Parity:
+        def even(self, s):
+            return s % 2 == 0
+
+    # anything callable can be marked, with no attribute set on it
+    assert _S().only_if(vectorized(Parity().even)).tolist() == [2, 4]
+    assert _S().only_if(vectorized(np.isfinite)).tolist() == [1, 2, 3, 4, 3]
+    assert _SN().only_if(vectorized(e_.notna())).tolist() == _SN().dropna().tolist()
+    assert _S().only_if(np.isfinite).tolist() == [1, 2, 3, 4, 3]
+    assert pd.Series(["foo", "bar", "baz"]).only_if(e_.startswith('b')).tolist() == ["bar", "baz"]
+    assert pd.Series(["foo", "BAR", "baz"]).only_if(e_.isupper()).tolist() == ["BAR"]
+
+
+def test_only_if_str_method_arguments():
+    # start and end have no equivalent in .str, so these are evaluated for each element
+    src = pd.Series(['abc', 'bcd', 'xbz'])
+    assert src.only_if(e_.startswith('b', 1)).tolist() == ['abc', 'xbz']
+    assert src.only_if(e_.endswith('b', 0, 2)).tolist() == ['abc', 'xbz']
+    assert src.only_if(e_.startswith(('a', 'x'))).tolist() == ['abc', 'xbz']
+
+
+def test_only_if_container_operand():
+    # each element is compared to the whole list or array, not to the one at its position
+    assert pd.Series([1, 2, 3]).only_if(e_ == [1, 5, 3]).tolist() == []
+    assert not vectorizes(e_ == np.array([1, 5, 3]))
+    assert vectorizes(e_ == np.int64(1))
+
+
+def test_df_only_in():
+    df = pd.DataFrame(dict(foo=[1, 2, 3, 4], bar=['a', 'b', 'a', 'b']))
+    assert_frame_equal(df.only_in(foo={1, 2, 3}, bar={'a'}), df.iloc[[0, 2]])
+    assert_frame_equal(df.not_in(foo={1}, bar={'b'}), df.iloc[[2]])
+    assert_frame_equal(df.only_in(), df)
+
+
+def test_metadata():
+    # one case per method through pandas' own thorough comparisons, to catch anything assert_eq overlooks
+    series = pd.Series([1, 2, 3, float('nan'), 3], name='foo')
+    df = pd.DataFrame(dict(foo=series))
+    for method, value, rows in (('only', 3, [2, 4]), ('without', 3, [0, 1, 3]), ('only_if', e_ > 2, [2, 4]),
+                                ('only_in', {3}, [2, 4]), ('not_in', {3}, [0, 1, 3]), ('gt_', 2, [2, 4])):
+        assert_series_equal(getattr(series, method)(value), series.iloc[rows])
+        assert_frame_equal(getattr(df, method)(foo=value), df.iloc[rows])
+    assert_series_equal(_S().count_distinct(), pd.Series([2, 1, 1, 1], index=[3, 1, 2, 4]))
@@ -0,0 +1,45 @@
+import pytest
+
+from flo.stopwatch import StopWatch, timed, timings
+
+
+def test_laps():
+    logged = []
+    with StopWatch('outer', verbose=False) as sw:
+        first = sw.lap('first')
+        second = sw.lap('second')
+        assert first.duration() == first.duration()
+        assert second._start == first._stop
+    assert sw.duration() >= first.duration() + second.duration()
+    assert sw.log(logged.append).startswith('outer: ')
+    assert [l.split(':')[0] for l in logged] == ['outer', '|-first', '|-second']
+    with pytest.raises(ValueError):
+        StopWatch().lap('never started')
+
+
+def test_verbose(capsys):
+    with StopWatch('quiet', verbose=False):
+        pass
+    assert capsys.readouterr().out == ''
+    with StopWatch('loud'):
+        pass
+    assert capsys.readouterr().out.startswith('loud: ')
+
+
+def test_timed():
+    @timed
+    def add(a, b):
+        """adds"""
+        return a + b
+
+    class Other:
+        @timed
+        def add(self, a, b):
+            return a + b
+
+    assert add(1, b=2) == 3
+    assert add.__name__ == 'add' and add.__doc__ == 'adds'
+    assert timings[f"{__name__}.test_timed.<locals>.add"] > 0
+    assert f"{__name__}.test_timed.<locals>.Other.add" not in timings
+    assert Other().add(1, 2) == 3
+    assert timings[f"{__name__}.test_timed.<locals>.Other.add"] > 0